@@ -1,22 +1,32 @@
+import time
+# start of this script run, before any import, for the first-paint measurement
+SCRIPT_START = time.perf_counter()
+
 import os
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
 import streamlit as st
 from pathlib import Path
-import sys
 from datetime import datetime
 import warnings
-import json
-import langchain_agent
+import hashlib
+import startup
+import tracing
+from rag_backend import make_backend
+from chat_store import ChatStore
+from chat_render import message_html, render_message
 
-# Ensure package path is available for CrewAI module imports
 PROJECT_ROOT = Path(__file__).resolve().parent
-CREW_SRC = PROJECT_ROOT / "bralma_crewai" / "src"
-if str(CREW_SRC) not in sys.path:
-    sys.path.insert(0, str(CREW_SRC))
+# chat messages rendered per rerun, and saved chats listed per sidebar page
+HISTORY_WINDOW = int(os.getenv("BRALMA_HISTORY_WINDOW", "30"))
+SESSION_PAGE_SIZE = 10
+
+
+@st.cache_resource(show_spinner=False)
+def get_backend():
+    """In-process RAG backend, or a client for the shared rag_service when BRALMA_RAG_SERVICE_URL is set."""
+    return make_backend()
 
-# Import direct LLM modules + RAG
-from bralma_crewai.main import run_pdf_rag_workflow
 
 warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 warnings.filterwarnings("ignore")
@@ -29,7 +39,14 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
- 
+
+# only after set_page_config, which must be the first Streamlit command on older versions
+backend = get_backend()
+
+# Load the embedder, store and CrewAI in the background while the first page renders
+if not backend.remote and os.getenv("BRALMA_WARM_UP", "1") != "0":
+    startup.start_warm_up()
+
 # Custom CSS for chatbot design
 st.markdown("""
     <style>
@@ -237,91 +254,211 @@ st.markdown("""
 # Initialize session state
 if 'messages' not in st.session_state:
     st.session_state.messages = []
-if 'chat_sessions' not in st.session_state:
-    st.session_state.chat_sessions = []  # List of saved chat sessions
+if 'current_session_id' not in st.session_state:
+    st.session_state.current_session_id = None  # saved session new messages are appended to
 if 'current_session_name' not in st.session_state:
     st.session_state.current_session_name = None
+if 'history_window' not in st.session_state:
+    st.session_state.history_window = HISTORY_WINDOW  # how many of the latest messages are rendered
+if 'older_in_store' not in st.session_state:
+    st.session_state.older_in_store = False  # saved session has messages not loaded yet
+if 'session_page' not in st.session_state:
+    st.session_state.session_page = 0
 if 'uploaded_files' not in st.session_state:
     st.session_state.uploaded_files = []  # [{"name": str, "chunks": int, "sig": str}]
 if 'processed_upload_sigs' not in st.session_state:
     st.session_state.processed_upload_sigs = []
+if 'ingest_job_ids' not in st.session_state:
+    st.session_state.ingest_job_ids = []  # jobs submitted from this session, oldest first
+if 'ingest_job_sigs' not in st.session_state:
+    st.session_state.ingest_job_sigs = {}  # job id -> content hash of its upload
+if 'finished_job_ids' not in st.session_state:
+    st.session_state.finished_job_ids = []
+if 'rag_mode' not in st.session_state:
+    st.session_state.rag_mode = "crew"
 
-# Hydrate uploaded files list from existing ChromaDB on startup
-if not st.session_state.uploaded_files:
-    persisted = langchain_agent.list_ingested_sources()
+
+def hydrate_uploaded_files():
+    """Fill the uploaded files list from the existing ChromaDB (once per session)."""
+    if st.session_state.uploaded_files:
+        return
+    persisted = backend.list_ingested_sources()
     if persisted:
         st.session_state.uploaded_files = [
-            {"name": p.get("name", "unknown"), "chunks": p.get("chunks", 0), "sig": p.get("name", "unknown")}
+            {"name": p.get("name", "unknown"), "chunks": p.get("chunks", 0), "sig": p.get("doc_hash") or p.get("name", "unknown")}
             for p in persisted
         ]
-        st.session_state.processed_upload_sigs = [p.get("name", "unknown") for p in persisted]
+        # uploads still queued, running or failed are not in the manifest, but the uploader
+        # still holds them: keep their signatures so the next rerun does not submit them again
+        st.session_state.processed_upload_sigs = list(dict.fromkeys(
+            [f["sig"] for f in st.session_state.uploaded_files] + unfinished_upload_sigs()
+        ))
 
-# Simple on-disk persistence for saved chats
-CHAT_STORE = PROJECT_ROOT / "chat_sessions.json"
 
+def unfinished_upload_sigs():
+    """Content hashes of this session's uploads whose job has not persisted."""
+    sigs = []
+    for job_id, sig in st.session_state.ingest_job_sigs.items():
+        job = backend.ingest_job(job_id)
+        if job is None or job["status"] != "persisted":
+            sigs.append(sig)
+    return sigs
 
-def load_saved_chats():
-    if not CHAT_STORE.exists():
-        return []
-    try:
-        with CHAT_STORE.open("r", encoding="utf-8") as f:
-            data = json.load(f)
-            return data if isinstance(data, list) else []
-    except Exception:
-        return []
 
+def render_uploaded_files():
+    if st.session_state.uploaded_files:
+        st.markdown(f"**{len(st.session_state.uploaded_files)} file(s) ingested**")
+        for i, f in enumerate(st.session_state.uploaded_files, 1):
+            col1, col2 = st.columns([4, 1])
+            with col1:
+                st.markdown(f"{i}. **{f['name']}** — {f.get('chunks', 0)} chunks")
+            with col2:
+                if st.button("🗑️", key=f"delete_doc_{i}", help="Remove document from ChromaDB"):
+                    backend.delete_source(f["name"])
+                    st.session_state.uploaded_files = [u for u in st.session_state.uploaded_files if u["name"] != f["name"]]
+                    st.session_state.processed_upload_sigs = [
+                        sig for sig in st.session_state.processed_upload_sigs if sig != f.get("sig")
+                    ]
+                    st.rerun()
+    else:
+        st.info("No files ingested yet")
 
-def persist_chats():
-    try:
-        serializable = []
-        for sess in st.session_state.chat_sessions:
-            msgs = []
-            for m in sess.get("messages", []):
-                msgs.append({
-                    "role": m.get("role"),
-                    "content": m.get("content"),
-                    "timestamp": m.get("timestamp").isoformat() if hasattr(m.get("timestamp"), "isoformat") else m.get("timestamp")
-                })
-            serializable.append({
-                "name": sess.get("name"),
-                "timestamp": sess.get("timestamp").isoformat() if hasattr(sess.get("timestamp"), "isoformat") else sess.get("timestamp"),
-                "messages": msgs
-            })
-        with CHAT_STORE.open("w", encoding="utf-8") as f:
-            json.dump(serializable, f, ensure_ascii=False, indent=2)
-    except Exception:
-        pass
-
-
-# Hydrate chat sessions from disk on startup
-if not st.session_state.chat_sessions:
-    saved = load_saved_chats()
-    if saved:
-        st.session_state.chat_sessions = saved
- 
-def get_bot_response(user_question):
+JOB_POLL_SECONDS = 2
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+
+
+def job_line(job):
+    name = job["filename"]
+    if job["status"] == "failed":
+        return f"❌ **{name}** failed: {job.get('error')}"
+    if job["status"] == "persisted":
+        result = job.get("result") or {}
+        if result.get("skipped"):
+            return f"✅ **{name}** already ingested as {result.get('duplicate_of')}"
+        return (f"✅ **{name}** version {result.get('doc_version')}, "
+                f"{result.get('chunks_ingested', 0)} new chunks")
+    pages = f"{job['pages_done']}/{job['pages_total']}" if job.get("pages_total") else str(job["pages_done"])
+    return f"⏳ **{name}** {job['status']} — {pages} pages, {job['chunks_written']} chunks"
+
+
+def render_ingest_jobs():
+    """Status of this session's ingest jobs; a finished job refreshes the document list."""
+    jobs = [job for job in (backend.ingest_job(job_id) for job_id in st.session_state.ingest_job_ids) if job]
+    for job in reversed(jobs):
+        st.markdown(job_line(job))
+        if job["status"] in ("parsing", "embedding") and job.get("pages_total"):
+            st.progress(min(1.0, job["pages_done"] / job["pages_total"]))
+    finished = [job["id"] for job in jobs if job["status"] in ("persisted", "failed")]
+    if set(finished) - set(st.session_state.finished_job_ids):
+        st.session_state.finished_job_ids = finished
+        st.session_state.uploaded_files = []  # re-read the manifest on the next run
+        st.rerun()
+
+
+def ingest_jobs_active():
+    return len(st.session_state.finished_job_ids) < len(st.session_state.ingest_job_ids)
+
+
+# Saved chats live in an append-only SQLite store; the old JSON file is imported once
+CHAT_JSON = PROJECT_ROOT / "chat_sessions.json"
+CHAT_DB = Path(os.getenv("BRALMA_CHAT_DB", str(PROJECT_ROOT / "chat_sessions.sqlite3")))
+
+
+@st.cache_resource
+def get_chat_store():
+    chat_store = ChatStore(str(CHAT_DB))
+    chat_store.import_json(CHAT_JSON)
+    return chat_store
+
+
+chat_store = get_chat_store()
+
+
+def load_session_messages(session_id, before_id=None):
+    """The newest HISTORY_WINDOW messages of a saved session (before before_id), read on demand."""
+    rows = chat_store.get_messages(session_id, limit=HISTORY_WINDOW, before_id=before_id)
+    st.session_state.older_in_store = len(rows) == HISTORY_WINDOW
+    return [
+        {"id": m["id"], "role": m["role"], "content": m["content"], "timestamp": datetime.fromtimestamp(m["created_at"])}
+        for m in rows
+    ]
+
+
+def open_session(session_id, name):
+    st.session_state.messages = load_session_messages(session_id)
+    st.session_state.current_session_id = session_id
+    st.session_state.current_session_name = name
+    st.session_state.history_window = HISTORY_WINDOW
+
+
+def show_older_messages():
+    """Widen the rendered window, fetching the previous page from the store when memory runs out."""
+    messages = st.session_state.messages
+    if len(messages) <= st.session_state.history_window and st.session_state.older_in_store:
+        oldest_id = next((m["id"] for m in messages if "id" in m), None)
+        st.session_state.messages = load_session_messages(st.session_state.current_session_id, oldest_id) + messages
+    st.session_state.history_window += HISTORY_WINDOW
+
+
+def remember_message(role, content):
+    """Add a message to the chat; a saved chat also gets it appended in the store."""
+    message = {"role": role, "content": content, "timestamp": datetime.now()}
+    st.session_state.messages.append(message)
+    if st.session_state.current_session_id is not None:
+        chat_store.append_message(st.session_state.current_session_id, role, content, message["timestamp"])
+
+
+def stream_bot_response(user_question):
     """
-    Calls the CrewAI workflow to get an answer (and optional quiz).
-    Context retrieval happens from ChromaDB via CrewAI tools.
+    Streams the answer of the selected RAG workflow piece by piece.
+    The quiz is appended as the last piece once it is ready.
     """
     try:
-        result = run_pdf_rag_workflow(user_question, "")
-        return str(result)
+        yield from backend.stream_rag_workflow(user_question, "", mode=st.session_state.rag_mode,
+                                              request_id=tracing.current_request_id())
     except Exception as e:
-        return f"Error from CrewAI workflow: {e}"
+        yield f"Error from CrewAI workflow: {e}"
+
+
  
 # Sidebar for uploaded files and chat history
 with st.sidebar:
     st.title("📋 Menu")
     st.markdown("---")
+
+    st.radio(
+        "Answer mode",
+        options=["crew", "direct"],
+        format_func=lambda m: "CrewAI agents" if m == "crew" else "Direct (fast)",
+        key="rag_mode",
+        horizontal=True,
+        help="Direct mode does one retrieval and one answer call, without the agent LLM hops",
+    )
+    backend_stats = backend.stats()
+    cache_stats = backend_stats["answer_cache"]
+    st.caption(f"Answer cache: {cache_stats['hits']} hits / {cache_stats['hits'] + cache_stats['misses']} questions "
+               f"({cache_stats['hit_rate']:.0%})")
+    groq_stats = backend_stats["groq"]
+    st.caption(f"Groq queue: {groq_stats['queue_depth']} waiting, {groq_stats['inflight']} in flight, "
+               f"{groq_stats['retries']} retries")
     
     with st.expander("📚 Uploaded Documents", expanded=True):
-        if st.session_state.uploaded_files:
-            st.markdown(f"**{len(st.session_state.uploaded_files)} file(s) ingested**")
-            for i, f in enumerate(st.session_state.uploaded_files, 1):
-                st.markdown(f"{i}. **{f['name']}** — {f.get('chunks', 0)} chunks")
-        else:
-            st.info("No files ingested yet")
+        # filled at the end of the script, after the main page has painted
+        uploaded_files_box = st.container()
+        if st.button("🔄 Reload store", use_container_width=True, help="Reopen ChromaDB, e.g. after a bulk ingest"):
+            backend.refresh_store()
+            st.session_state.uploaded_files = []
+            st.rerun()
+
+    if st.session_state.ingest_job_ids:
+        with st.expander("📥 Ingest jobs", expanded=ingest_jobs_active()):
+            if ingest_jobs_active() and _fragment is not None:
+                # poll only this block while jobs run, so chatting is not interrupted
+                _fragment(run_every=JOB_POLL_SECONDS)(render_ingest_jobs)()
+            else:
+                render_ingest_jobs()
+                if ingest_jobs_active() and st.button("🔄 Refresh jobs", use_container_width=True):
+                    st.rerun()
 
     st.markdown("")
 
@@ -329,44 +466,79 @@ with st.sidebar:
     with st.expander("💬 Chat History", expanded=True):
         col1, col2 = st.columns([3, 2])
         with col1:
-            if st.button("💾 Save Chat", use_container_width=True, disabled=len(st.session_state.messages) == 0):
-                if st.session_state.messages:
-                    session_name = f"Chat {len(st.session_state.chat_sessions) + 1} - {datetime.now().strftime('%m/%d %H:%M')}"
-                    st.session_state.chat_sessions.append({
-                        "name": session_name,
-                        "messages": st.session_state.messages.copy(),
-                        "timestamp": datetime.now()
-                    })
-                    st.session_state.current_session_name = session_name
-                    persist_chats()
-                    st.rerun()
+            # once saved, new messages are appended to the session as they arrive
+            if st.button("💾 Save Chat", use_container_width=True,
+                         disabled=not st.session_state.messages or st.session_state.current_session_id is not None):
+                session_name = f"Chat {chat_store.count_sessions() + 1} - {datetime.now().strftime('%m/%d %H:%M')}"
+                st.session_state.current_session_id = chat_store.create_session(session_name, st.session_state.messages)
+                st.session_state.current_session_name = session_name
+                st.rerun()
         with col2:
             if st.button("🗑️ New Chat", use_container_width=True):
                 st.session_state.messages = []
+                st.session_state.older_in_store = False
+                st.session_state.history_window = HISTORY_WINDOW
+                st.session_state.current_session_id = None
                 st.session_state.current_session_name = None
-                persist_chats()
                 st.rerun()
         
         st.markdown("")
         
-        if st.session_state.chat_sessions:
-            st.markdown(f"**{len(st.session_state.chat_sessions)} saved chat(s)**")
-            for idx, session in enumerate(reversed(st.session_state.chat_sessions)):
-                actual_idx = len(st.session_state.chat_sessions) - 1 - idx
+        session_count = chat_store.count_sessions()
+        if session_count:
+            st.markdown(f"**{session_count} saved chat(s)**")
+            pages = max(1, -(-session_count // SESSION_PAGE_SIZE))
+            page = min(st.session_state.session_page, pages - 1)
+            for session in chat_store.list_sessions(limit=SESSION_PAGE_SIZE, offset=page * SESSION_PAGE_SIZE):
                 col1, col2 = st.columns([4, 1])
                 with col1:
-                    if st.button(f"💬 {session['name']}", key=f"load_session_{actual_idx}", use_container_width=True):
-                        st.session_state.messages = session['messages'].copy()
-                        st.session_state.current_session_name = session['name']
+                    if st.button(f"💬 {session['name']}", key=f"load_session_{session['id']}", use_container_width=True):
+                        open_session(session["id"], session["name"])
                         st.rerun()
                 with col2:
-                    if st.button("🗑️", key=f"delete_session_{actual_idx}", help="Delete chat"):
-                        st.session_state.chat_sessions.pop(actual_idx)
-                        persist_chats()
+                    if st.button("🗑️", key=f"delete_session_{session['id']}", help="Delete chat"):
+                        chat_store.delete_session(session["id"])
+                        if st.session_state.current_session_id == session["id"]:
+                            st.session_state.current_session_id = None
+                            st.session_state.older_in_store = False
+                            st.session_state.current_session_name = None
+                        st.rerun()
+            if pages > 1:
+                prev_col, page_col, next_col = st.columns([1, 2, 1])
+                with prev_col:
+                    if st.button("◀", key="session_page_prev", disabled=page == 0):
+                        st.session_state.session_page = page - 1
+                        st.rerun()
+                with page_col:
+                    st.caption(f"Page {page + 1} / {pages}")
+                with next_col:
+                    if st.button("▶", key="session_page_next", disabled=page >= pages - 1):
+                        st.session_state.session_page = page + 1
                         st.rerun()
         else:
             st.info("No saved chats")
  
+    with st.expander("🚀 Startup", expanded=False):
+        report = startup.startup_report()
+        st.caption("Warm-up " + ("done" if startup.warm_up_done() else "running in background"))
+        first_paint = startup.first_paint()
+        if first_paint is not None:
+            target = startup.FIRST_PAINT_TARGET_SECONDS
+            verdict = "within" if first_paint <= target else "over"
+            st.caption(f"First paint {first_paint * 1000:.0f} ms, {verdict} the {target * 1000:.0f} ms target")
+        for item in report:
+            st.markdown(f"- {item['component']}: {item['seconds'] * 1000:.0f} ms")
+
+    if (backend.remote or tracing.is_enabled()) and st.session_state.get("last_request_id"):
+        with st.expander("⏱️ Latency breakdown", expanded=False):
+            st.caption(f"Last question (request {st.session_state.last_request_id})")
+            for stage in backend.breakdown(st.session_state.last_request_id):
+                tokens = ""
+                if "prompt_tokens" in stage:
+                    tokens = f", {stage['prompt_tokens']} + {stage.get('completion_tokens', 0)} tokens"
+                calls = f" ×{stage['calls']}" if stage["calls"] > 1 else ""
+                st.markdown(f"- {stage['name']}{calls}: {stage['ms']:.0f} ms{tokens}")
+
 # App header
 st.title("What's on the agenda today?")
  
@@ -380,75 +552,72 @@ uploaded_file = st.file_uploader(
  
 # Process uploaded file (PDF or PPTX)
 if uploaded_file is not None:
-    file_sig = uploaded_file.name  # use filename-based signature for debouncing and persistence hydration
+    file_bytes = uploaded_file.getvalue()
+    file_sig = hashlib.sha256(file_bytes).hexdigest()  # content hash: renamed copies dedup, changed files re-ingest
     already = file_sig in st.session_state.processed_upload_sigs
 
     if already:
         st.info(f"✅ {uploaded_file.name} uploaded")
     else:
-        with st.spinner(f"Ingesting {uploaded_file.type} into ChromaDB..."):
-            file_bytes = uploaded_file.read()
-            try:
-                ingest_result = langchain_agent.ingest_pdf(file_bytes, uploaded_file.name)
-                ingested = {
-                    "name": uploaded_file.name,
-                    "chunks": ingest_result.get('chunks_ingested', 0),
-                    "sig": file_sig
-                }
-                st.session_state.uploaded_files.append(ingested)
-                st.session_state.processed_upload_sigs.append(file_sig)
-                st.success(f"✅ {uploaded_file.name} uploaded")
-                st.toast(f"Uploaded {uploaded_file.name}")
-            except Exception as e:
-                st.error(f"Failed to ingest {uploaded_file.name}: {e}")
+        # parsing and embedding run on the background ingest queue; the sidebar shows progress
+        try:
+            job = backend.submit_ingest(file_bytes, uploaded_file.name)
+            st.session_state.processed_upload_sigs.append(file_sig)
+            st.session_state.ingest_job_ids.append(job["id"])
+            st.session_state.ingest_job_sigs[job["id"]] = file_sig
+            st.toast(f"Queued {uploaded_file.name} for ingestion")
+            st.rerun()
+        except Exception as e:
+            st.error(f"Failed to queue {uploaded_file.name}: {e}")
  
 # Display welcome message or chat history
 if not st.session_state.messages:
     st.markdown('<div class="subtitle">Drop a PDF or PowerPoint file to ingest into ChromaDB, then ask me anything.</div>', unsafe_allow_html=True)
 else:
-    # Display chat history
+    # Display the latest messages as a single block; older ones are loaded on demand
+    window = st.session_state.history_window
+    hidden = len(st.session_state.messages) > window or st.session_state.older_in_store
+    if hidden and st.button("⬆️ Show older messages"):
+        show_older_messages()
+        st.rerun()
     chat_container = st.container()
     with chat_container:
-        for message in st.session_state.messages:
-            if message["role"] == "user":
-                st.markdown(f"""
-                    <div class="chat-message user">
-                        <div class="message-header">You</div>
-                        <div class="message-content">{message["content"]}</div>
-                    </div>
-                    """, unsafe_allow_html=True)
-            else:
-                st.markdown(f"""
-                    <div class="chat-message bot">
-                        <div class="message-header">Assistant</div>
-                        <div class="message-content">{message["content"]}</div>
-                    </div>
-                    """, unsafe_allow_html=True)
+        st.markdown("".join(message_html(m["role"], m["content"]) for m in st.session_state.messages[-window:]),
+                    unsafe_allow_html=True)
  
 # Add spacing before input
 st.markdown("<br>" * 3, unsafe_allow_html=True)
  
 # Chat input at the bottom
 user_input = st.chat_input("Ask anything")
+
+# Sidebar document list: hydrating it may open ChromaDB, so do it after the page painted
+startup.record_first_paint(SCRIPT_START)
+with uploaded_files_box:
+    hydrate_uploaded_files()
+    render_uploaded_files()
  
 if user_input:
     # Add user message to chat
-    st.session_state.messages.append({
-        "role": "user",
-        "content": user_input,
-        "timestamp": datetime.now()
-    })
+    remember_message("user", user_input)
    
-    # Get bot response
-    with st.spinner("🤔 Thinking..."):
-        bot_response = get_bot_response(user_input)
+    st.markdown(message_html("user", user_input), unsafe_allow_html=True)
+
+    # Stream bot response into the chat area as tokens arrive
+    placeholder = st.empty()
+    bot_response = ""
+    with st.spinner("🤔 Thinking..."), tracing.request() as request_id:
+        started = time.perf_counter()
+        with tracing.span("rag.workflow", mode=st.session_state.rag_mode):
+            for piece in stream_bot_response(user_input):
+                if not bot_response:
+                    tracing.record("ui.first_token", time.perf_counter() - started)
+                bot_response += piece
+                placeholder.markdown(render_message("assistant", bot_response), unsafe_allow_html=True)
+    st.session_state.last_request_id = request_id
    
     # Add bot response to chat
-    st.session_state.messages.append({
-        "role": "assistant",
-        "content": bot_response,
-        "timestamp": datetime.now()
-    })
+    remember_message("assistant", bot_response)
    
     # Rerun to update chat display
     st.rerun()
@@ -0,0 +1,122 @@
+"""
+Semantic answer cache in front of the RAG workflow.
+
+Questions are compared by cosine similarity of their embeddings; a hit above the
+threshold returns the stored answer and quiz. Every entry remembers the corpus version
+it was answered against, so ingesting or deleting documents invalidates the cache.
+Entries expire after a TTL and the least recently used ones are evicted beyond max_entries.
+The defaults come from BRALMA_ANSWER_CACHE_THRESHOLD, BRALMA_ANSWER_CACHE_TTL (seconds) and
+BRALMA_ANSWER_CACHE_MAX_ENTRIES.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+DEFAULT_THRESHOLD = float(os.getenv("BRALMA_ANSWER_CACHE_THRESHOLD", "0.92"))
+DEFAULT_TTL_SECONDS = float(os.getenv("BRALMA_ANSWER_CACHE_TTL", str(6 * 3600)))
+DEFAULT_MAX_ENTRIES = int(os.getenv("BRALMA_ANSWER_CACHE_MAX_ENTRIES", "1024"))
+
+
+class SemanticAnswerCache:
+    def __init__(
+        self,
+        threshold: float = DEFAULT_THRESHOLD,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[int, Dict]" = OrderedDict()
+        self._corpus_version: Optional[str] = None
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        vec = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def _check_version(self, corpus_version: str) -> None:
+        if corpus_version != self._corpus_version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._corpus_version = corpus_version
+
+    def _expire(self, now: float) -> None:
+        expired = [key for key, entry in self._entries.items() if now - entry["created"] > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+            self.evictions += 1
+
+    def lookup(self, question_vector: List[float], corpus_version: str) -> Optional[Dict]:
+        """Return {"question", "answer", "quiz", "similarity"} for the closest cached question, or None."""
+        vec = self._normalize(question_vector)
+        now = time.time()
+        with self._lock:
+            self._check_version(corpus_version)
+            self._expire(now)
+            best_key, best_sim = None, -1.0
+            if self._entries:
+                keys = list(self._entries.keys())
+                matrix = np.stack([self._entries[k]["vector"] for k in keys])
+                sims = matrix @ vec
+                idx = int(np.argmax(sims))
+                best_key, best_sim = keys[idx], float(sims[idx])
+            if best_key is None or best_sim < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(best_key)
+            entry = self._entries[best_key]
+            return {"question": entry["question"], "answer": entry["answer"], "quiz": entry["quiz"],
+                    "similarity": best_sim}
+
+    def store(self, question: str, question_vector: List[float], answer: str, quiz: str, corpus_version: str) -> None:
+        with self._lock:
+            if self._corpus_version is None:
+                self._corpus_version = corpus_version
+            elif corpus_version != self._corpus_version:
+                # answered against a corpus that changed meanwhile: the answer is stale, and
+                # switching back to its version would wipe entries of the current one
+                return
+            self._entries[self._next_id] = {
+                "question": question,
+                "vector": self._normalize(question_vector),
+                "answer": answer,
+                "quiz": quiz,
+                "created": time.time(),
+            }
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+__all__ = ["SemanticAnswerCache", "DEFAULT_THRESHOLD", "DEFAULT_TTL_SECONDS", "DEFAULT_MAX_ENTRIES"]
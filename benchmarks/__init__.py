@@ -0,0 +1,9 @@
+"""
+Benchmarks for the document RAG pipeline.
+Run a benchmark as a module from the project root, e.g. `python -m benchmarks.bench_store`.
+
+- run: offline end-to-end suite (synthetic corpora + fake Groq server), writes JSON results
+- corpus: synthetic PDF/PPTX generators
+- fake_groq: local stand-in for the Groq chat-completions API
+- bench_*: focused before/after comparisons for single optimizations
+"""
@@ -0,0 +1,70 @@
+"""
+Embedding throughput and retrieval agreement of the CPU embedding backends.
+
+Embeds a synthetic corpus with every backend, reports texts/s, and measures how many of
+each query's top-k neighbours the alternative backend shares with the torch baseline.
+
+    python -m benchmarks.bench_embedding_backends --texts 2000 --threads 4 --batch-size 64
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from benchmarks.corpus import VOCABULARY
+from embedding_backends import BACKENDS, make_embeddings
+from langchain_agent import EMBED_MODEL
+
+
+def _synthetic_texts(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(40, 160))) for _ in range(n)]
+
+
+def _top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    corpus = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    return np.argsort(-(queries @ corpus.T), axis=1)[:, :k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=int, default=1000, help="corpus size")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    corpus_texts = _synthetic_texts(args.texts)
+    query_texts = [" ".join(t.split()[:12]) for t in _synthetic_texts(args.queries, seed=11)]
+
+    results = {}
+    for backend in BACKENDS:
+        model, used = make_embeddings(EMBED_MODEL, backend, threads=args.threads, batch_size=args.batch_size)
+        if used != backend:
+            print(f"skipping {backend}: not available")
+            continue
+        model.embed_documents(corpus_texts[:8])  # warm-up
+        start = time.perf_counter()
+        corpus = np.asarray(model.embed_documents(corpus_texts), dtype=np.float32)
+        elapsed = time.perf_counter() - start
+        queries = np.asarray([model.embed_query(q) for q in query_texts], dtype=np.float32)
+        results[backend] = {"texts_per_s": len(corpus_texts) / elapsed, "top_k": _top_k(corpus, queries, args.k)}
+
+    baseline = results.get("torch")
+    print(f"{len(corpus_texts)} texts, {len(query_texts)} queries, k={args.k}, threads={args.threads}, "
+          f"batch size={args.batch_size}")
+    print(f"{'backend':<12}{'texts/s':>10}{'top-k overlap vs torch':>26}")
+    for backend, res in results.items():
+        overlap = "-"
+        if baseline is not None:
+            shared = [len(set(a) & set(b)) / args.k for a, b in zip(res["top_k"], baseline["top_k"])]
+            overlap = f"{np.mean(shared):.3f}"
+        print(f"{backend:<12}{res['texts_per_s']:>10.1f}{overlap:>26}")
+
+
+if __name__ == "__main__":
+    main()
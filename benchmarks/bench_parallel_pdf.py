@@ -0,0 +1,58 @@
+"""
+Serial against process-pool extraction and splitting of one large PDF, by page count.
+
+The serial run is what ingest_pdf does below PARALLEL_MIN_PAGES (iter_pdf_pages, then
+split_text per page); the parallel run is iter_pdf_pages_parallel. Both must produce the
+same pages, chunks and metadata in the same order. Pool start-up is paid once before
+timing, as it is in a long-running app.
+
+    python -m benchmarks.bench_parallel_pdf --pages 50 150 400 1000 --workers 2 4 8
+"""
+
+import argparse
+import time
+
+from benchmarks.common import best_of
+from benchmarks.corpus import make_pdf
+from document_parser import PARALLEL_MIN_PAGES, iter_pdf_pages, iter_pdf_pages_parallel, split_text
+
+
+def _serial(data: bytes, name: str):
+    pages = []
+    for page in iter_pdf_pages(data, name):
+        page["chunks"] = split_text(page["text"])
+        pages.append(page)
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[50, 150, 400, 1000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    warm = make_pdf(2, seed=args.seed)
+    for workers in args.workers:
+        start = time.perf_counter()
+        list(iter_pdf_pages_parallel(warm, "warm-up.pdf", workers))
+        print(f"pool start-up with {workers} workers: {time.perf_counter() - start:.2f}s")
+
+    print(f"\nparallel ingest starts at {PARALLEL_MIN_PAGES} pages")
+    print(f"{'pages':>8}{'chunks':>8}{'serial p/s':>12}" + "".join(f"{f'x{w} p/s':>10}{'speedup':>9}" for w in args.workers))
+    for n in args.pages:
+        data = make_pdf(n, seed=args.seed)
+        name = f"bench_{n}.pdf"
+        t_serial, serial = best_of(lambda: _serial(data, name), args.repeat)
+        row = f"{n:>8}{sum(len(p['chunks']) for p in serial):>8}{n / t_serial:>12.1f}"
+        for workers in args.workers:
+            t_parallel, parallel = best_of(lambda: list(iter_pdf_pages_parallel(data, name, workers)), args.repeat)
+            if parallel != serial:
+                raise SystemExit(f"{n} pages, {workers} workers: parallel output differs from the serial one")
+            row += f"{n / t_parallel:>10.1f}{t_serial / t_parallel:>8.2f}x"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
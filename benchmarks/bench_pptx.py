@@ -0,0 +1,75 @@
+"""
+PPTX extraction: UnstructuredPowerPointLoader against the native python-pptx path.
+
+Times both loaders on generated decks (or --files), serially and with a process pool for
+the native path, and checks text parity: the share of the words UnstructuredPowerPointLoader
+finds that the native extractor also returns (recall), and the reverse (precision).
+
+    python -m benchmarks.bench_pptx --slides 40 80 150 --workers 4
+    python -m benchmarks.bench_pptx --files lecture.pptx --repeat 5
+"""
+
+import argparse
+import re
+import tempfile
+from collections import Counter
+from pathlib import Path
+
+from benchmarks.common import best_of
+from benchmarks.corpus import make_pptx
+from pptx_extractor import extract_slides
+
+WORD = re.compile(r"\w+")
+
+
+def _unstructured_text(file_bytes: bytes) -> str:
+    from langchain_community.document_loaders import UnstructuredPowerPointLoader
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "deck.pptx"
+        path.write_bytes(file_bytes)
+        return "\n".join(d.page_content for d in UnstructuredPowerPointLoader(str(path)).load())
+
+
+def _native_text(file_bytes: bytes, workers: int) -> str:
+    return "\n".join(p["text"] for p in extract_slides(file_bytes, "deck.pptx", workers=workers))
+
+
+def _parity(reference: str, candidate: str) -> tuple:
+    """(recall, precision) of candidate's words against reference's, counting repeats."""
+    ref, cand = Counter(WORD.findall(reference.lower())), Counter(WORD.findall(candidate.lower()))
+    common = sum((ref & cand).values())
+    return common / max(sum(ref.values()), 1), common / max(sum(cand.values()), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slides", type=int, nargs="+", default=[40, 80, 150])
+    parser.add_argument("--files", nargs="*", default=None, help="real decks instead of generated ones")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.files:
+        decks = [(Path(f).name, Path(f).read_bytes()) for f in args.files]
+    else:
+        decks = [(f"{n} slides", make_pptx(n, seed=args.seed)) for n in args.slides]
+
+    print(f"{'deck':>16}{'slides':>8}{'unstructured/s':>16}{'native/s':>10}"
+          f"{f'native x{args.workers}/s':>16}{'speedup':>9}{'recall':>8}{'precision':>11}")
+    for name, data in decks:
+        t_ref, ref_text = best_of(lambda: _unstructured_text(data), args.repeat)
+        t_native, native_text = best_of(lambda: _native_text(data, 1), args.repeat)
+        t_parallel, parallel_text = best_of(lambda: _native_text(data, args.workers), args.repeat)
+        if parallel_text != native_text:
+            raise SystemExit(f"{name}: parallel extraction differs from the serial one")
+        slides = len(extract_slides(data, name))
+        recall, precision = _parity(ref_text, native_text)
+        print(f"{name[:16]:>16}{slides:>8}{slides / t_ref:>16.1f}{slides / t_native:>10.1f}"
+              f"{slides / t_parallel:>16.1f}{t_ref / min(t_native, t_parallel):>8.1f}x"
+              f"{recall:>8.3f}{precision:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Query-embedding throughput with and without micro-batching under concurrent callers.
+
+Every client thread embeds its own questions one at a time, as concurrent Streamlit
+sessions or rag_service workers do; the batched run routes them through QueryBatcher.
+
+    python -m benchmarks.bench_query_batch --clients 1 8 32 --queries 50 --wait-ms 2
+"""
+
+import argparse
+import threading
+import time
+
+from benchmarks.common import summarize
+from benchmarks.corpus import questions
+from langchain_agent import embeddings
+from query_batcher import QueryBatcher
+
+
+def _run(embed, clients: int, per_client: int, seed: int):
+    latencies = []
+    lock = threading.Lock()
+
+    def client(i: int):
+        local = []
+        for q in questions(per_client, seed=seed + i):
+            start = time.perf_counter()
+            embed(q)
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return len(latencies) / elapsed, summarize(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--queries", type=int, default=50, help="questions per client")
+    parser.add_argument("--wait-ms", type=float, default=2.0)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    model = embeddings.load()
+    unbatched = getattr(model, "inner", model).embed_query
+    unbatched("warm-up")
+
+    print(f"{'clients':>8}{'mode':>10}{'q/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'fill':>8}")
+    for clients in args.clients:
+        qps, lat = _run(unbatched, clients, args.queries, args.seed)
+        print(f"{clients:>8}{'single':>10}{qps:>10.1f}{lat['p50']:>10.1f}{lat['p95']:>10.1f}{'-':>8}")
+        batcher = QueryBatcher(embeddings.embed_query_batch, max_wait_ms=args.wait_ms,
+                               max_batch_size=args.batch_size)
+        qps, lat = _run(batcher.embed, clients, args.queries, args.seed)
+        fill = batcher.stats()["fill_rate"]
+        print(f"{clients:>8}{'batched':>10}{qps:>10.1f}{lat['p50']:>10.1f}{lat['p95']:>10.1f}{fill:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+End-to-end latency of the CrewAI workflow vs. the direct RAG pipeline.
+
+Needs GROQ_API_KEY and an ingested corpus. Both workflows are called directly, not
+through run_rag, so the semantic answer cache cannot serve one mode's answers to the other.
+
+    python -m benchmarks.bench_rag_modes --runs 5
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+CREW_SRC = Path(__file__).resolve().parent.parent / "bralma_crewai" / "src"
+if str(CREW_SRC) not in sys.path:
+    sys.path.insert(0, str(CREW_SRC))
+
+from benchmarks.corpus import QUESTIONS  # noqa: E402
+from bralma_crewai.main import RAG_MODES, run_direct_rag_workflow, run_pdf_rag_workflow  # noqa: E402
+
+WORKFLOWS = {"crew": run_pdf_rag_workflow, "direct": run_direct_rag_workflow}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="questions per mode")
+    parser.add_argument("--modes", nargs="+", default=list(RAG_MODES), choices=RAG_MODES)
+    args = parser.parse_args()
+
+    results = {}
+    for mode in args.modes:
+        timings = []
+        for i in range(args.runs):
+            start = time.perf_counter()
+            WORKFLOWS[mode](QUESTIONS[i % len(QUESTIONS)])
+            timings.append(time.perf_counter() - start)
+        results[mode] = timings
+
+    print(f"{'mode':<10}{'mean s':>10}{'min s':>10}{'max s':>10}")
+    for mode, timings in results.items():
+        print(f"{mode:<10}{statistics.mean(timings):>10.2f}{min(timings):>10.2f}{max(timings):>10.2f}")
+    if "crew" in results and "direct" in results:
+        print(f"direct speedup: {statistics.mean(results['crew']) / statistics.mean(results['direct']):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Streamlit rerun time of Frontend.py against chat-history length.
+
+Runs the app headless with streamlit's AppTest, seeds the session with n messages
+(question/answer pairs with a quiz-sized answer) and times reruns, once with the default
+history window and once with the window opened to the full history.
+
+    python -m benchmarks.bench_rerun --lengths 10 100 1000 --reruns 5
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.common import summarize
+
+FRONTEND = Path(__file__).resolve().parent.parent / "Frontend.py"
+ANSWER = ("Gradient descent updates the weights against the gradient of the loss. " * 12
+          + "\n## Quiz\n" + "".join(f"{i}. Question {i}?\n" for i in range(1, 6)))
+
+
+def _history(n: int):
+    return [{"role": "user" if i % 2 == 0 else "assistant",
+             "content": f"Question {i // 2}: what is gradient descent?" if i % 2 == 0 else ANSWER,
+             "timestamp": datetime.now()} for i in range(n)]
+
+
+def _rerun_ms(n: int, reruns: int, window=None):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(FRONTEND), default_timeout=120)
+    at.session_state["messages"] = _history(n)
+    if window is not None:
+        at.session_state["history_window"] = window
+    at.run()  # first run pays for imports and cache fills
+    timings = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        at.run()
+        timings.append((time.perf_counter() - start) * 1000)
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return summarize(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lengths", type=int, nargs="+", default=[10, 100, 1000], help="messages in the history")
+    parser.add_argument("--reruns", type=int, default=5)
+    args = parser.parse_args()
+
+    scratch = tempfile.TemporaryDirectory(prefix="bralma_rerun_")
+    os.environ.setdefault("BRALMA_DATA_DIR", scratch.name)
+    os.environ.setdefault("BRALMA_CHAT_DB", os.path.join(scratch.name, "chat_sessions.sqlite3"))
+    os.environ["BRALMA_WARM_UP"] = "0"
+
+    print(f"{'messages':>10}{'windowed p50 ms':>18}{'full p50 ms':>14}")
+    try:
+        for n in args.lengths:
+            windowed = _rerun_ms(n, args.reruns)
+            full = _rerun_ms(n, args.reruns, window=n)
+            print(f"{n:>10}{windowed['p50']:>18.1f}{full['p50']:>14.1f}")
+    finally:
+        scratch.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Per-query latency: reopening Chroma on every call vs. the shared VectorStore handle.
+
+    python -m benchmarks.bench_store --chunks 2000 --queries 50
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+
+from langchain_community.vectorstores import Chroma
+
+import langchain_agent
+from benchmarks.common import percentile
+from benchmarks.corpus import QUESTIONS
+
+
+def _time_queries(run_query, n_queries):
+    timings = []
+    for i in range(n_queries):
+        start = time.perf_counter()
+        run_query(QUESTIONS[i % len(QUESTIONS)])
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=1000, help="number of synthetic chunks to index")
+    parser.add_argument("--queries", type=int, default=30, help="queries per mode")
+    parser.add_argument("--k", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as persist_dir:
+        texts = [f"Synthetic lecture chunk {i} about topic {i % 37} and exercise {i % 11}." for i in range(args.chunks)]
+        metadatas = [{"source": f"bench_{i % 20}.pdf"} for i in range(args.chunks)]
+        seed = Chroma(persist_directory=persist_dir, embedding_function=langchain_agent.embeddings)
+        seed.add_texts(texts, metadatas=metadatas)
+        del seed
+
+        def reopen_query(q):
+            db = Chroma(persist_directory=persist_dir, embedding_function=langchain_agent.embeddings)
+            return db.similarity_search_with_score(q, k=args.k)
+
+        shared = langchain_agent.VectorStore(persist_dir, langchain_agent.embeddings)
+
+        def shared_query(q):
+            return shared.get().similarity_search_with_score(q, k=args.k)
+
+        # warm up the embedder so the first timed call does not pay for model loading
+        langchain_agent.embeddings.embed_query("warm up")
+
+        results = {
+            "reopen per call (before)": _time_queries(reopen_query, args.queries),
+            "shared VectorStore (after)": _time_queries(shared_query, args.queries),
+        }
+        shared.close()
+
+    print(f"{args.chunks} chunks, {args.queries} queries per mode, k={args.k}")
+    print(f"{'mode':<30}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for mode, timings in results.items():
+        print(f"{mode:<30}{statistics.mean(timings):>10.1f}{percentile(timings, 50):>10.1f}{percentile(timings, 95):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
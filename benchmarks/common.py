@@ -0,0 +1,42 @@
+"""Shared helpers for the benchmark scripts."""
+
+import statistics
+import time
+from typing import Callable, Dict, List, Tuple
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile; 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def summarize(values: List[float]) -> Dict:
+    """Latency summary (same unit as the input) used in every JSON result."""
+    return {
+        "n": len(values),
+        "mean": statistics.mean(values) if values else 0.0,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else 0.0,
+    }
+
+
+def timed(fn: Callable, *args, **kwargs) -> Tuple[object, float]:
+    """(result, seconds) of one call."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def best_of(fn: Callable[[], object], repeat: int) -> Tuple[float, object]:
+    """(fastest seconds, last result) over repeat calls of fn."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        result, elapsed = timed(fn)
+        best = min(best, elapsed)
+    return best, result
@@ -0,0 +1,90 @@
+"""
+Synthetic PDF and PPTX corpora of configurable size.
+
+Text is drawn from a fixed vocabulary with a seeded RNG, so a given (files, pages, seed)
+always produces the same bytes and benchmark runs are comparable across commits.
+"""
+
+import io
+import random
+from typing import Iterator, List, Tuple
+
+VOCABULARY = (
+    "gradient descent loss function neural network backpropagation matrix vector eigenvalue "
+    "probability distribution variance regression classification cluster kernel database index "
+    "transaction normalisatie tentamen hoorcollege oefening opdracht deadline hoofdstuk formule "
+    "bewijs stelling definitie algoritme complexiteit recursie sortering graaf boom hashing "
+    "INF1024 STAT2031 DB3001 Bayes Fourier Laplace Dijkstra Kruskal Markov"
+).split()
+
+QUESTIONS = [
+    "What is gradient descent?",
+    "Explain the difference between regression and classification.",
+    "Wat is de deadline van de opdracht?",
+    "Which algorithm does Dijkstra describe?",
+    "What is covered in INF1024?",
+    "Leg normalisatie in databases uit.",
+    "How does backpropagation work?",
+    "What is a Markov chain?",
+]
+
+
+def _paragraph(rng: random.Random, words: int) -> str:
+    sentences, current = [], []
+    for _ in range(words):
+        current.append(rng.choice(VOCABULARY))
+        if len(current) >= rng.randint(8, 18):
+            sentences.append(" ".join(current).capitalize() + ".")
+            current = []
+    if current:
+        sentences.append(" ".join(current).capitalize() + ".")
+    return " ".join(sentences)
+
+
+def make_pdf(pages: int, seed: int = 0, words_per_page: int = 350) -> bytes:
+    import fitz  # PyMuPDF
+
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        text = f"Chapter {i + 1}\n\n{_paragraph(rng, words_per_page)}"
+        page.insert_textbox(fitz.Rect(50, 50, page.rect.width - 50, page.rect.height - 50), text, fontsize=9)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def make_pptx(slides: int, seed: int = 0, bullets_per_slide: int = 5) -> bytes:
+    from pptx import Presentation
+
+    rng = random.Random(seed)
+    prs = Presentation()
+    layout = prs.slide_layouts[1]  # title and content
+    for i in range(slides):
+        slide = prs.slides.add_slide(layout)
+        slide.shapes.title.text = f"Lecture slide {i + 1}: {rng.choice(VOCABULARY)}"
+        body = slide.placeholders[1].text_frame
+        body.text = _paragraph(rng, 20)
+        for _ in range(bullets_per_slide - 1):
+            body.add_paragraph().text = _paragraph(rng, 20)
+        slide.notes_slide.notes_text_frame.text = _paragraph(rng, 40)
+    buf = io.BytesIO()
+    prs.save(buf)
+    return buf.getvalue()
+
+
+def make_corpus(files: int, pages: int, pptx_ratio: float = 0.25, seed: int = 0,
+                start: int = 0) -> Iterator[Tuple[str, bytes]]:
+    """Yield (filename, bytes) for files start..files-1; every 1/pptx_ratio-th file is a deck."""
+    every = int(round(1 / pptx_ratio)) if pptx_ratio > 0 else 0
+    for i in range(start, files):
+        if every and i % every == every - 1:
+            yield f"bench_deck_{i:04d}.pptx", make_pptx(pages, seed=seed + i)
+        else:
+            yield f"bench_doc_{i:04d}.pdf", make_pdf(pages, seed=seed + i)
+
+
+def questions(n: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    return [f"{rng.choice(QUESTIONS)} ({rng.choice(VOCABULARY)})" for _ in range(n)]
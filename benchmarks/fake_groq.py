@@ -0,0 +1,163 @@
+"""
+Local stand-in for the Groq chat-completions API.
+
+Serves POST /openai/v1/chat/completions (plain and streaming) with a configurable
+time-to-first-token delay and token rate, so the pipeline can be benchmarked offline and
+reproducibly. Point the groq SDK at it with GROQ_BASE_URL and litellm (CrewAI) with
+GROQ_API_BASE; FakeGroqServer.configure_env() sets both.
+
+    python -m benchmarks.fake_groq --port 8790 --delay 0.3 --tokens-per-s 250
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER_TEXT = (
+    "Gradient descent is an optimisation algorithm that updates parameters in the direction of the "
+    "negative gradient of the loss.\n- It uses a learning rate.\n- It converges to a local minimum."
+)
+QUIZ_TEXT = "## Quiz\n1. What is a learning rate?\n2. What is a gradient?\n3. What is a loss function?\n" \
+            "4. When does gradient descent converge?\n5. What is a local minimum?"
+
+
+def _tokens(text: str):
+    # whitespace-delimited pieces are close enough to tokens for timing purposes
+    pieces = text.split(" ")
+    return [p if i == 0 else " " + p for i, p in enumerate(pieces)]
+
+
+def _reply_for(body: dict) -> str:
+    messages = body.get("messages") or []
+    prompt = " ".join(str(m.get("content", "")) for m in messages)
+    if "## Quiz" in prompt:
+        return QUIZ_TEXT
+    if "Final Answer" in prompt:
+        # CrewAI agents parse the ReAct-style "Final Answer:" marker
+        return f"Thought: I now know the final answer\nFinal Answer: {ANSWER_TEXT}"
+    return ANSWER_TEXT
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "FakeGroq/1.0"
+
+    def log_message(self, format, *args):  # keep benchmark output clean
+        pass
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", "0"))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        cfg = self.server.config
+        cfg["requests"] += 1
+
+        text = _reply_for(body)
+        tokens = _tokens(text)
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in body.get("messages") or [])
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = body.get("model", "fake")
+        created = int(time.time())
+        time.sleep(cfg["delay"])
+
+        if body.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            for token in tokens:
+                chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                         "choices": [{"index": 0, "delta": {"role": "assistant", "content": token}, "finish_reason": None}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                time.sleep(1 / cfg["tokens_per_s"])
+            final = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                     "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                     "x_groq": {"usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                                          "total_tokens": prompt_tokens + len(tokens)}}}
+            self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+            self.wfile.flush()
+            return
+
+        time.sleep(len(tokens) / cfg["tokens_per_s"])
+        payload = json.dumps({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                      "total_tokens": prompt_tokens + len(tokens)},
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class FakeGroqServer:
+    """Threaded fake Groq server; usable as a context manager."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, delay: float = 0.2, tokens_per_s: float = 200.0):
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.config = {"delay": delay, "tokens_per_s": tokens_per_s, "requests": 0}
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def requests(self) -> int:
+        return self.httpd.config["requests"]
+
+    def configure_env(self) -> None:
+        """Point the groq SDK and litellm at this server (call before the first Groq client is built)."""
+        os.environ["GROQ_BASE_URL"] = self.url
+        os.environ["GROQ_API_BASE"] = f"{self.url}/openai/v1"
+        os.environ.setdefault("GROQ_API_KEY", "fake-benchmark-key")
+        # the fake server has no rate limit; keep groq_scheduler from throttling the run
+        os.environ.setdefault("BRALMA_GROQ_RPM", "100000")
+        os.environ.setdefault("BRALMA_GROQ_TPM", "100000000")
+
+    def start(self) -> "FakeGroqServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-groq", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake Groq chat-completions server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8790)  # rag_service uses 8765
+    parser.add_argument("--delay", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--tokens-per-s", type=float, default=200.0)
+    args = parser.parse_args()
+    server = FakeGroqServer(args.host, args.port, args.delay, args.tokens_per_s)
+    print(f"Fake Groq listening on {server.url} (GROQ_BASE_URL={server.url})")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
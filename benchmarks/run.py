@@ -0,0 +1,143 @@
+"""
+End-to-end benchmark suite, fully offline.
+
+Generates synthetic PDF/PPTX corpora, ingests them into a scratch data directory and, at
+every corpus size, measures ingest throughput, query latency (p50/p95/p99),
+list_ingested_sources time and answer latency against a local fake Groq server. Results
+are written as JSON so runs can be compared across commits.
+
+    python -m benchmarks.run --sizes 10 50 200 --pages 20 --queries 100 --out bench.json
+    python -m benchmarks.run --sizes 10 --crew     # also time the CrewAI workflow
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import summarize, timed
+from benchmarks.corpus import make_corpus, questions
+from benchmarks.fake_groq import FakeGroqServer
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+CREW_SRC = PROJECT_ROOT / "bralma_crewai" / "src"
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def _bench_ingest(langchain_agent, files):
+    pages = chunks = 0
+    start = time.perf_counter()
+    for name, data in files:
+        result = langchain_agent.ingest_pdf(data, name)
+        pages += result.get("pages", 0)
+        chunks += result.get("chunks_ingested", 0)
+    elapsed = time.perf_counter() - start
+    return {"files": len(files), "pages": pages, "chunks": chunks, "seconds": elapsed,
+            "pages_per_s": pages / elapsed if elapsed else 0.0, "chunks_per_s": chunks / elapsed if elapsed else 0.0}
+
+
+def _bench_latency(fn, inputs):
+    timings = []
+    for item in inputs:
+        _, elapsed = timed(fn, item)
+        timings.append(elapsed * 1000)
+    return summarize(timings)
+
+
+def run_suite(args) -> dict:
+    import langchain_agent
+    import groq_answer_llm
+    from bralma_crewai import main as crew_main
+
+    results = []
+    ingested = 0
+    for size in sorted(args.sizes):
+        files = list(make_corpus(size, args.pages, pptx_ratio=args.pptx_ratio, seed=args.seed, start=ingested))
+        ingest = _bench_ingest(langchain_agent, files)
+        ingested = size
+
+        qs = questions(args.queries, seed=args.seed + size)
+        langchain_agent.query(qs[0])  # warm-up
+        entry = {
+            "corpus_files": size,
+            "pages_per_file": args.pages,
+            "ingest": ingest,
+            "query_ms": _bench_latency(lambda q: langchain_agent.query(q, k=4), qs),
+            "list_ingested_sources_ms": _bench_latency(lambda _: langchain_agent.list_ingested_sources(), range(10)),
+        }
+        llm_qs = qs[:args.llm_queries]
+        contexts = {q: langchain_agent.get_context_for_question(q) for q in llm_qs}
+        entry["answer_and_maybe_quiz_ms"] = _bench_latency(
+            lambda q: groq_answer_llm.answer_and_maybe_quiz(q, contexts[q]), llm_qs)
+        entry["direct_workflow_ms"] = _bench_latency(crew_main.run_direct_rag_workflow, llm_qs)
+        if args.crew:
+            entry["crew_workflow_ms"] = _bench_latency(crew_main.run_pdf_rag_workflow, llm_qs)
+        results.append(entry)
+        print(f"{size} files: ingest {ingest['pages_per_s']:.1f} pages/s, query p50 "
+              f"{entry['query_ms']['p50']:.1f} ms / p95 {entry['query_ms']['p95']:.1f} ms, answer p50 "
+              f"{entry['answer_and_maybe_quiz_ms']['p50']:.0f} ms")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50], help="cumulative corpus sizes (files)")
+    parser.add_argument("--pages", type=int, default=20, help="pages (or slides) per file")
+    parser.add_argument("--pptx-ratio", type=float, default=0.25, help="fraction of files that are PPTX decks")
+    parser.add_argument("--queries", type=int, default=50, help="retrieval queries per corpus size")
+    parser.add_argument("--llm-queries", type=int, default=5, help="answer/workflow calls per corpus size")
+    parser.add_argument("--llm-delay", type=float, default=0.2, help="fake Groq time to first token (s)")
+    parser.add_argument("--llm-tokens-per-s", type=float, default=200.0, help="fake Groq token rate")
+    parser.add_argument("--crew", action="store_true", help="also benchmark the CrewAI workflow")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=None, help="scratch data dir (default: a temporary directory)")
+    parser.add_argument("--out", default="bench_results.json", help="JSON output path")
+    args = parser.parse_args(argv)
+
+    server = FakeGroqServer(delay=args.llm_delay, tokens_per_s=args.llm_tokens_per_s).start()
+    server.configure_env()
+    tmp = None
+    if args.data_dir is None:
+        tmp = tempfile.TemporaryDirectory(prefix="bralma_bench_")
+        args.data_dir = tmp.name
+    # must be set before langchain_agent is imported
+    os.environ["BRALMA_DATA_DIR"] = args.data_dir
+    for path in (str(PROJECT_ROOT), str(CREW_SRC)):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+    try:
+        started = time.time()
+        results = run_suite(args)
+        report = {
+            "commit": _git_commit(),
+            "started_at": started,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "config": {k: v for k, v in vars(args).items() if k != "out"},
+            "fake_groq_requests": server.requests,
+            "results": results,
+        }
+        Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Wrote {args.out}")
+    finally:
+        server.stop()
+        if tmp is not None:
+            tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
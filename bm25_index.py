@@ -0,0 +1,154 @@
+"""
+Lexical BM25 inverted index over the same chunks that are stored in Chroma.
+
+Catches exact-term questions (course codes, formula names, Dutch/English jargon) that
+dense MiniLM search misses. The index lives in a compact SQLite file next to chroma_db:
+terms and chunks are interned to integer ids and postings are a WITHOUT ROWID table.
+It is updated incrementally as chunks are added or deleted, never rebuilt in full.
+"""
+
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# standard BM25 parameters
+K1 = 1.5
+B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_RE.findall(text.lower()) if len(t) > 1 or t.isdigit()]
+
+
+class BM25Index:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS terms (term_id INTEGER PRIMARY KEY, term TEXT UNIQUE NOT NULL,"
+                               " df INTEGER NOT NULL DEFAULT 0)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS chunks (doc_id INTEGER PRIMARY KEY, chunk_id TEXT UNIQUE NOT NULL,"
+                               " length INTEGER NOT NULL)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS postings (term_id INTEGER NOT NULL, doc_id INTEGER NOT NULL,"
+                               " tf INTEGER NOT NULL, PRIMARY KEY (term_id, doc_id)) WITHOUT ROWID")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_postings_doc ON postings(doc_id)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS stats (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self._conn.execute("INSERT OR IGNORE INTO stats (key, value) VALUES ('n_docs', 0), ('total_length', 0)")
+
+    def _term_ids(self, terms: Iterable[str]) -> Dict[str, int]:
+        terms = list(terms)
+        self._conn.executemany("INSERT OR IGNORE INTO terms (term) VALUES (?)", [(t,) for t in terms])
+        ids = {}
+        for start in range(0, len(terms), 500):
+            batch = terms[start:start + 500]
+            rows = self._conn.execute(
+                f"SELECT term, term_id FROM terms WHERE term IN ({','.join('?' * len(batch))})", batch
+            ).fetchall()
+            ids.update(rows)
+        return ids
+
+    def _remove_locked(self, chunk_ids: Sequence[str]) -> None:
+        for chunk_id in chunk_ids:
+            row = self._conn.execute("SELECT doc_id, length FROM chunks WHERE chunk_id = ?", (chunk_id,)).fetchone()
+            if row is None:
+                continue
+            doc_id, length = row
+            self._conn.execute(
+                "UPDATE terms SET df = df - 1 WHERE term_id IN (SELECT term_id FROM postings WHERE doc_id = ?)", (doc_id,)
+            )
+            self._conn.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+            self._conn.execute("DELETE FROM chunks WHERE doc_id = ?", (doc_id,))
+            self._conn.execute("UPDATE stats SET value = value - 1 WHERE key = 'n_docs'")
+            self._conn.execute("UPDATE stats SET value = value - ? WHERE key = 'total_length'", (length,))
+
+    def add(self, chunk_ids: Sequence[str], texts: Sequence[str]) -> None:
+        """Index chunks; re-adding an existing chunk id replaces its postings."""
+        if not chunk_ids:
+            return
+        pairs = dict(zip(chunk_ids, texts))
+        chunk_ids = list(pairs)
+        tokenized = [Counter(tokenize(text)) for text in pairs.values()]
+        with self._lock, self._conn:
+            self._remove_locked(chunk_ids)
+            term_ids = self._term_ids({t for counts in tokenized for t in counts})
+            for chunk_id, counts in zip(chunk_ids, tokenized):
+                length = sum(counts.values())
+                cur = self._conn.execute("INSERT INTO chunks (chunk_id, length) VALUES (?, ?)", (chunk_id, length))
+                doc_id = cur.lastrowid
+                self._conn.executemany("INSERT INTO postings (term_id, doc_id, tf) VALUES (?, ?, ?)",
+                                       [(term_ids[t], doc_id, tf) for t, tf in counts.items()])
+                self._conn.executemany("UPDATE terms SET df = df + 1 WHERE term_id = ?",
+                                       [(term_ids[t],) for t in counts])
+                self._conn.execute("UPDATE stats SET value = value + 1 WHERE key = 'n_docs'")
+                self._conn.execute("UPDATE stats SET value = value + ? WHERE key = 'total_length'", (length,))
+
+    def remove(self, chunk_ids: Sequence[str]) -> None:
+        if not chunk_ids:
+            return
+        with self._lock, self._conn:
+            self._remove_locked(chunk_ids)
+
+    def contains(self, chunk_ids: Sequence[str]) -> set:
+        """Subset of chunk_ids that are already indexed."""
+        found = set()
+        with self._lock:
+            for start in range(0, len(chunk_ids), 500):
+                batch = list(chunk_ids[start:start + 500])
+                rows = self._conn.execute(
+                    f"SELECT chunk_id FROM chunks WHERE chunk_id IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                found.update(r[0] for r in rows)
+        return found
+
+    def search(self, question: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Top-k (chunk_id, bm25 score) for the question, best first."""
+        terms = list(dict.fromkeys(tokenize(question)))
+        if not terms:
+            return []
+        with self._lock:
+            stats = dict(self._conn.execute("SELECT key, value FROM stats").fetchall())
+            n_docs = stats.get("n_docs", 0)
+            if n_docs <= 0:
+                return []
+            avg_len = stats.get("total_length", 0) / n_docs or 1.0
+            rows = self._conn.execute(
+                "SELECT c.chunk_id, c.length, t.df, p.tf FROM terms t"
+                " JOIN postings p ON p.term_id = t.term_id"
+                " JOIN chunks c ON c.doc_id = p.doc_id"
+                f" WHERE t.term IN ({','.join('?' * len(terms))})",
+                terms,
+            ).fetchall()
+        scores: Dict[str, float] = {}
+        for chunk_id, length, df, tf in rows:
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            norm = tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / avg_len))
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * norm
+        return sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:k]
+
+    def __len__(self) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM stats WHERE key = 'n_docs'").fetchone()
+        return row[0] if row else 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], weights: Sequence[float], rrf_k: int = 60) -> List[Tuple[str, float]]:
+    """Fuse ranked id lists: score(id) = sum(weight / (rrf_k + rank)), best first."""
+    fused: Dict[str, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, key in enumerate(ranking, start=1):
+            fused[key] = fused.get(key, 0.0) + weight / (rrf_k + rank)
+    return sorted(fused.items(), key=lambda kv: kv[1], reverse=True)
+
+
+__all__ = ["BM25Index", "tokenize", "reciprocal_rank_fusion"]
@@ -4,6 +4,7 @@ RAG Agent: Retrieves context from vector DB.
 Answer Agent: Generates answers with quizzes.
 """
 
+import time
 from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
 from dotenv import load_dotenv
@@ -11,6 +12,8 @@ from .tools.pdf_tools import (
     retrieve_context_tool,
     answer_with_rag_tool
 )
+import tracing  # project root is on sys.path via pdf_tools
+from .scheduled_llm import ScheduledGroqLLM
 
 load_dotenv()
 
@@ -27,6 +30,7 @@ class PDFProcessingCrew():
         """Handles context retrieval from vector database"""
         return Agent(
             config=self.agents_config['rag_agent'],
+            llm=ScheduledGroqLLM(self.agents_config['rag_agent']['llm']),
             tools=[retrieve_context_tool],
             verbose=True,
             allow_delegation=False
@@ -37,6 +41,7 @@ class PDFProcessingCrew():
         """Generates answers with quizzes using context"""
         return Agent(
             config=self.agents_config['answer_agent'],
+            llm=ScheduledGroqLLM(self.agents_config['answer_agent']['llm']),
             tools=[answer_with_rag_tool],
             verbose=True,
             allow_delegation=False
@@ -65,11 +70,20 @@ class PDFProcessingCrew():
         1. RAG Agent retrieves context
         2. Answer Agent generates answer + quiz
         """
+        self._task_mark = time.perf_counter()
         return Crew(
             agents=self.agents,
             tasks=self.tasks,
             process=Process.sequential,
             verbose=True,
-            memory=True
+            memory=True,
+            task_callback=self._trace_task
         )
 
+    def _trace_task(self, output) -> None:
+        """Record each finished task as a span (tasks run sequentially, so time since the previous one)."""
+        now = time.perf_counter()
+        name = getattr(output, "name", None) or getattr(output, "agent", None) or "task"
+        tracing.record("crewai.task", now - self._task_mark, task=str(name))
+        self._task_mark = now
+
@@ -4,11 +4,27 @@ CrewAI Orchestration Entry Point.
 Demonstrates multi-agent workflow for document RAG system (PDF + PPTX).
 """
 
+import sys
 import warnings
-from bralma_crewai.crew import PDFProcessingCrew
+from pathlib import Path
 
 warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 
+# Project root holds the RAG modules used by the direct pipeline
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+RAG_MODES = ("crew", "direct")
+
+from answer_cache import SemanticAnswerCache  # noqa: E402  (needs PROJECT_ROOT on sys.path)
+import tracing  # noqa: E402
+from context_builder import token_budget_for  # noqa: E402
+
+# Shared across Streamlit sessions in this process; invalidated by corpus changes.
+# Threshold, TTL and size come from the BRALMA_ANSWER_CACHE_* settings.
+answer_cache = SemanticAnswerCache()
+
 
 def run_pdf_rag_workflow(question: str, pdf_context: str = ""):
     """
@@ -22,15 +38,144 @@ def run_pdf_rag_workflow(question: str, pdf_context: str = ""):
         Answer with quiz (orchestrated by CrewAI agents)
     """
     try:
+        # crewai is heavy to import; load it on the first crew run (or in the warm-up)
+        from bralma_crewai.crew import PDFProcessingCrew
         crew = PDFProcessingCrew()
-        return crew.crew().kickoff(inputs={
-            'question': question,
-            'context': pdf_context
-        })
+        with tracing.span("crewai.kickoff"):
+            return crew.crew().kickoff(inputs={
+                'question': question,
+                'context': pdf_context
+            })
     except Exception as e:
         raise Exception(f"CrewAI workflow error: {e}")
 
 
+def _format_answer(answer: str, quiz: str = "") -> str:
+    return f"{answer}\n{quiz}" if quiz else answer
+
+
+def _direct_answer(question: str, pdf_context: str = "", k: int = 4, question_embedding=None):
+    """Retrieve once, then generate answer and quiz concurrently. Returns (answer, quiz)."""
+    import langchain_agent
+    import groq_answer_llm
+
+    context = pdf_context or langchain_agent.get_context_for_question(
+        question, k=k, embedding=question_embedding, token_budget=token_budget_for(groq_answer_llm.ANSWER_MODEL))
+    answer, quiz_future = groq_answer_llm.answer_with_lazy_quiz(question, context)
+    return answer, groq_answer_llm.quiz_result(quiz_future)
+
+
+def run_direct_rag_workflow(question: str, pdf_context: str = "", k: int = 4) -> str:
+    """
+    Fast path without agent LLM hops: one retrieval, then answer + quiz.
+
+    Args:
+        question: User's question
+        pdf_context: Optional document context; retrieved from ChromaDB when empty
+        k: Number of chunks to retrieve
+
+    Returns:
+        Answer with quiz, in the same format as the crew workflow
+    """
+    try:
+        return _format_answer(*_direct_answer(question, pdf_context, k=k))
+    except Exception as e:
+        raise Exception(f"Direct RAG workflow error: {e}")
+
+
+def _cache_lookup(question: str):
+    """Embed the question and look it up in the answer cache. Returns (embedding, version, hit)."""
+    import langchain_agent
+
+    with tracing.span("query.embed"):
+        embedding = langchain_agent.embeddings.embed_query(question)
+    version = langchain_agent.corpus_version()
+    with tracing.span("answer_cache.lookup") as span:
+        hit = answer_cache.lookup(embedding, version)
+        span.set(hit=hit is not None)
+    return embedding, version, hit
+
+
+def _cache_store(question: str, embedding, answer: str, quiz: str, version: str) -> None:
+    """Cache a generated answer, unless it is empty or an error message in place of an answer."""
+    import groq_answer_llm
+
+    if not answer.strip() or answer.strip() == groq_answer_llm.MISSING_KEY_MESSAGE:
+        return
+    answer_cache.store(question, embedding, answer, quiz, version)
+
+
+def stream_rag_workflow(question: str, pdf_context: str = "", mode: str = "direct", k: int = 4):
+    """
+    Streaming variant of run_rag: yields text pieces as they are generated.
+
+    The direct pipeline streams answer tokens and appends the quiz once it is ready. The
+    crew workflow cannot stream through its agents, so it yields its result in one piece.
+    Cached answers are yielded in one piece as well.
+    """
+    if mode not in RAG_MODES:
+        raise ValueError(f"Unknown RAG mode: {mode!r} (expected one of {RAG_MODES})")
+
+    embedding = version = None
+    if not pdf_context:
+        embedding, version, hit = _cache_lookup(question)
+        if hit:
+            yield _format_answer(hit["answer"], hit["quiz"])
+            return
+
+    if mode == "crew":
+        answer = str(run_pdf_rag_workflow(question, pdf_context))
+        yield answer
+        quiz = ""
+    else:
+        import langchain_agent
+        import groq_answer_llm
+
+        try:
+            context = pdf_context or langchain_agent.get_context_for_question(
+                question, k=k, embedding=embedding, token_budget=token_budget_for(groq_answer_llm.ANSWER_MODEL))
+            quiz_future = groq_answer_llm.start_quiz(question, context)
+            answer = ""
+            for piece in groq_answer_llm.stream_answer_with_context(question, context):
+                answer += piece
+                yield piece
+            quiz = groq_answer_llm.quiz_result(quiz_future)
+            if quiz:
+                yield f"\n{quiz}"
+        except Exception as e:
+            raise Exception(f"Direct RAG workflow error: {e}")
+
+    if embedding is not None:
+        _cache_store(question, embedding, answer, quiz, version)
+
+
+def run_rag(question: str, pdf_context: str = "", mode: str = "crew"):
+    """
+    Dispatch to the CrewAI workflow ("crew") or the direct pipeline ("direct").
+    Questions without explicit context go through the semantic answer cache.
+    """
+    if mode not in RAG_MODES:
+        raise ValueError(f"Unknown RAG mode: {mode!r} (expected one of {RAG_MODES})")
+    if pdf_context:
+        if mode == "direct":
+            return run_direct_rag_workflow(question, pdf_context)
+        return run_pdf_rag_workflow(question, pdf_context)
+
+    embedding, version, hit = _cache_lookup(question)
+    if hit:
+        return _format_answer(hit["answer"], hit["quiz"])
+
+    if mode == "direct":
+        try:
+            answer, quiz = _direct_answer(question, question_embedding=embedding)
+        except Exception as e:
+            raise Exception(f"Direct RAG workflow error: {e}")
+    else:
+        answer, quiz = str(run_pdf_rag_workflow(question)), ""
+    _cache_store(question, embedding, answer, quiz, version)
+    return _format_answer(answer, quiz)
+
+
 if __name__ == "__main__":
     question = "What are the main topics in this document?"
     result = run_pdf_rag_workflow(question)
@@ -0,0 +1,60 @@
+"""
+CrewAI LLM that sends the agents' Groq calls through groq_scheduler.
+
+Agents would otherwise call Groq through litellm, outside the process-wide per-model
+request and token budgets that the direct pipeline uses, so concurrent crews and answer
+traffic could exceed the key's limits together.
+"""
+
+from typing import Any, Dict, List, Optional, Union
+
+from crewai import BaseLLM
+
+from groq_client import get_client
+from groq_scheduler import PRIORITY_ANSWER, scheduler
+import tracing
+
+# Groq accepts at most 4 stop sequences
+MAX_STOP_SEQUENCES = 4
+CONTEXT_WINDOW = 128_000
+
+
+class ScheduledGroqLLM(BaseLLM):
+    def __init__(self, model: str, temperature: Optional[float] = None, **kwargs):
+        # agents.yaml names models the litellm way ("groq/<model>")
+        super().__init__(model=model.split("/", 1)[1] if model.startswith("groq/") else model,
+                         temperature=temperature, **kwargs)
+
+    def call(self, messages: Union[str, List[Dict[str, str]]], tools: Optional[List[dict]] = None,
+             callbacks: Optional[List[Any]] = None, available_functions: Optional[Dict[str, Any]] = None,
+             **kwargs) -> str:
+        client = get_client()
+        if client is None:
+            raise RuntimeError("GROQ API key is missing!")
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        params: Dict[str, Any] = {}
+        if self.temperature is not None:
+            params["temperature"] = self.temperature
+        stop = [s for s in (getattr(self, "stop", None) or []) if s][:MAX_STOP_SEQUENCES]
+        if stop:
+            params["stop"] = stop
+        with tracing.span("groq.completion", model=self.model, kind="crew") as span:
+            completion = scheduler.complete(client, self.model, messages, priority=PRIORITY_ANSWER, **params)
+            usage = getattr(completion, "usage", None)
+            if usage is not None:
+                span.set(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+        return completion.choices[0].message.content or ""
+
+    def supports_function_calling(self) -> bool:
+        # tools are used through CrewAI's text (ReAct) format
+        return False
+
+    def supports_stop_words(self) -> bool:
+        return True
+
+    def get_context_window_size(self) -> int:
+        return CONTEXT_WINDOW
+
+
+__all__ = ["ScheduledGroqLLM"]
@@ -11,7 +11,7 @@ from crewai.tools import BaseTool
 PROJECT_ROOT = Path(__file__).parent.parent.parent.parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
-# Import existing modules (source of truth)
+# Import existing modules (source of truth); langchain_agent.store is shared with the frontend
 import langchain_agent
 import groq_answer_llm
 
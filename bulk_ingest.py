@@ -0,0 +1,195 @@
+"""
+Bulk ingestion of a folder (or list) of PDF and PPTX files into ChromaDB.
+
+Files are parsed and split in a process pool, chunks are embedded and written to Chroma
+in large batches, and every file whose chunks are persisted is appended to a manifest so
+an interrupted run resumes where it stopped.
+
+    python bulk_ingest.py course_material/ extra/deck.pptx --workers 8 --batch-size 512
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from document_parser import SUPPORTED_EXTENSIONS, parse_file
+
+
+BASE_DIR = Path(__file__).parent
+MANIFEST_PATH = str(BASE_DIR / "bulk_ingest_manifest.jsonl")
+BATCH_SIZE = 512
+# parse jobs submitted ahead per worker process
+IN_FLIGHT_PER_WORKER = 2
+
+
+def collect_files(inputs: Iterable[str]) -> Dict[Path, str]:
+    """Expand directories (recursively) and files into {document path: source name}, sorted by path.
+
+    The source name is the path relative to the input directory (week1/intro.pdf), or the
+    file name for a file given directly. Two documents with the same source name would
+    overwrite each other's chunks, so that is an error.
+    """
+    files: Dict[Path, str] = {}
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            for p in path.rglob("*"):
+                if p.is_file() and p.suffix.lower() in SUPPORTED_EXTENSIONS:
+                    files[p.resolve()] = p.relative_to(path).as_posix()
+        elif path.is_file() and path.suffix.lower() in SUPPORTED_EXTENSIONS:
+            files.setdefault(path.resolve(), path.name)
+    by_source: Dict[str, List[Path]] = {}
+    for p, source in files.items():
+        by_source.setdefault(source, []).append(p)
+    clashes = {source: paths for source, paths in by_source.items() if len(paths) > 1}
+    if clashes:
+        details = "; ".join(f"{source}: {', '.join(map(str, paths))}" for source, paths in sorted(clashes.items()))
+        raise ValueError(f"documents with the same source name: {details}")
+    return dict(sorted(files.items()))
+
+
+def _file_key(path: Path) -> str:
+    stat = path.stat()
+    return f"{path}|{stat.st_size}|{stat.st_mtime_ns}"
+
+
+def load_manifest(manifest_path: str) -> Dict[str, str]:
+    """Return {file key: status}; the last line written for a file wins."""
+    status = {}
+    if not Path(manifest_path).exists():
+        return status
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn last line after a crash
+            status[entry.get("key")] = entry.get("status")
+    return status
+
+
+def _append_manifest(manifest_path: str, entry: Dict) -> None:
+    with open(manifest_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def bulk_ingest(
+    inputs: Iterable[str],
+    workers: Optional[int] = None,
+    batch_size: int = BATCH_SIZE,
+    manifest_path: str = MANIFEST_PATH,
+    on_file_done: Optional[Callable[[Dict], None]] = None,
+) -> Dict:
+    """Ingest every PDF/PPTX under inputs. Returns totals and pages/s and chunks/s throughput."""
+    import langchain_agent  # loads the embedder; keep it out of the pool workers
+
+    files = collect_files(inputs)  # path -> source name
+    manifest = load_manifest(manifest_path)
+    keys = {path: _file_key(path) for path in files}
+    pending = [path for path in files if manifest.get(keys[path]) != "done"]
+
+    totals = {"files": len(files), "files_done": len(files) - len(pending), "files_skipped": 0, "files_failed": 0,
+              "pages": 0, "chunks": 0, "errors": []}
+    writer = langchain_agent.ChunkWriter(batch_size=batch_size)
+    seen_hashes: Dict[str, Dict] = {}
+    start = time.perf_counter()
+
+    def mark_done(path: Path, stats: Dict) -> Callable[[], None]:
+        def callback():
+            _append_manifest(manifest_path, {"key": keys[path], "path": str(path), "status": "done",
+                                             "doc_hash": stats.get("doc_hash"), "chunks": stats.get("chunks_total", 0)})
+            totals["files_done"] += 1
+            if on_file_done:
+                on_file_done({"path": str(path), **stats})
+        return callback
+
+    def consume(path: Path, future) -> None:
+        try:
+            parsed = future.result()
+        except Exception as e:
+            totals["files_failed"] += 1
+            totals["errors"].append({"path": str(path), "error": str(e)})
+            return
+
+        # a file that was started before an interruption may be partially stored, so only
+        # fresh files may be skipped as whole-document duplicates
+        if manifest.get(keys[path]) != "started":
+            duplicate = seen_hashes.get(parsed["doc_hash"]) or langchain_agent.find_ingested(parsed["doc_hash"])
+            if duplicate is not None:
+                totals["files_skipped"] += 1
+                writer.after_flush(mark_done(path, {"doc_hash": parsed["doc_hash"], "skipped": True,
+                                                    "duplicate_of": duplicate["source"]}))
+                return
+
+        _append_manifest(manifest_path, {"key": keys[path], "path": str(path), "status": "started"})
+        seen_hashes[parsed["doc_hash"]] = {"source": parsed["filename"]}
+        stats = langchain_agent.ingest_parsed(parsed, writer)
+        totals["pages"] += stats["pages"]
+        totals["chunks"] += stats["chunks_ingested"]
+        writer.after_flush(mark_done(path, stats))
+
+    workers = workers or os.cpu_count() or 1
+    queue = iter(pending)
+    in_flight: Dict = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # only a few parsed documents wait at a time, so memory does not grow with the corpus
+        while True:
+            while len(in_flight) < workers * IN_FLIGHT_PER_WORKER:
+                path = next(queue, None)
+                if path is None:
+                    break
+                in_flight[pool.submit(parse_file, str(path), files[path])] = path
+            if not in_flight:
+                break
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                consume(in_flight.pop(future), future)
+
+    writer.flush()
+    langchain_agent.persist_store()
+
+    elapsed = time.perf_counter() - start
+    totals["seconds"] = elapsed
+    totals["pages_per_s"] = totals["pages"] / elapsed if elapsed else 0.0
+    totals["chunks_per_s"] = totals["chunks"] / elapsed if elapsed else 0.0
+    return totals
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk-ingest PDF and PPTX files into ChromaDB.")
+    parser.add_argument("inputs", nargs="+", help="directories and/or files to ingest")
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="chunks per embed/write batch")
+    parser.add_argument("--manifest", default=MANIFEST_PATH, help="resume manifest (JSON lines)")
+    args = parser.parse_args(argv)
+
+    def report(info: Dict):
+        if info.get("skipped"):
+            print(f"skipped {info['path']} (identical to {info.get('duplicate_of')})")
+        else:
+            print(f"ingested {info['path']}: {info.get('pages', 0)} pages, {info.get('chunks_ingested', 0)} new chunks")
+
+    try:
+        totals = bulk_ingest(args.inputs, workers=args.workers, batch_size=args.batch_size,
+                             manifest_path=args.manifest, on_file_done=report)
+    except ValueError as e:
+        print(f"ERROR {e}")
+        return 2
+    for err in totals["errors"]:
+        print(f"FAILED {err['path']}: {err['error']}")
+    print(
+        f"{totals['files_done']}/{totals['files']} files done, {totals['files_skipped']} skipped, "
+        f"{totals['files_failed']} failed | {totals['pages']} pages, {totals['chunks']} chunks in "
+        f"{totals['seconds']:.1f}s | {totals['pages_per_s']:.1f} pages/s, {totals['chunks_per_s']:.1f} chunks/s"
+    )
+    return 1 if totals["files_failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
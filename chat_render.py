@@ -0,0 +1,29 @@
+"""
+HTML for chat messages.
+
+Lives outside Frontend.py because Streamlit re-executes the script in a fresh namespace on
+every rerun: a cache defined there is rebuilt each time, while this module is imported
+once per process, so the cache survives reruns and sessions.
+"""
+
+from functools import lru_cache
+
+
+def render_message(role: str, content: str) -> str:
+    """HTML block of one message, uncached (for answers still being streamed)."""
+    css_class, header = ("user", "You") if role == "user" else ("bot", "Assistant")
+    return f"""
+                    <div class="chat-message {css_class}">
+                        <div class="message-header">{header}</div>
+                        <div class="message-content">{content}</div>
+                    </div>
+                    """
+
+
+@lru_cache(maxsize=2048)
+def message_html(role: str, content: str) -> str:
+    """Cached render_message for finished messages, since every rerun renders the same history."""
+    return render_message(role, content)
+
+
+__all__ = ["message_html", "render_message"]
@@ -0,0 +1,186 @@
+"""
+Append-only SQLite store for saved chats.
+
+Sessions and messages are rows: saving a chat or adding a message is one small insert
+instead of rewriting every session, the session list is paged and a session's messages
+are only read when it is opened. The database runs in WAL mode, so several Streamlit
+processes can write to it at the same time. Deleting a session marks it deleted; rows
+are never rewritten.
+
+The old chat_sessions.json is imported once (import_json), or by hand:
+
+    python chat_store.py --import chat_sessions.json
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+SESSION_COLUMNS = ("id", "name", "created_at", "updated_at", "message_count")
+MESSAGE_COLUMNS = ("id", "session_id", "role", "content", "created_at")
+
+
+def _timestamp(value) -> float:
+    """Epoch seconds from a datetime, an ISO string or a number (now when missing)."""
+    if value is None:
+        return time.time()
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return time.time()
+
+
+class ChatStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " name TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " message_count INTEGER NOT NULL DEFAULT 0,"
+                " deleted_at REAL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " session_id INTEGER NOT NULL REFERENCES sessions(id),"
+                " role TEXT NOT NULL,"
+                " content TEXT NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_session ON messages(session_id, id)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(deleted_at, updated_at)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _insert_messages(self, session_id: int, messages: Iterable[Dict]) -> int:
+        rows = [(session_id, m.get("role") or "user", m.get("content") or "", _timestamp(m.get("timestamp")))
+                for m in messages]
+        self._conn.executemany("INSERT INTO messages (session_id, role, content, created_at) VALUES (?, ?, ?, ?)", rows)
+        self._conn.execute("UPDATE sessions SET message_count = message_count + ?, updated_at = ? WHERE id = ?",
+                           (len(rows), time.time(), session_id))
+        return len(rows)
+
+    def create_session(self, name: str, messages: Iterable[Dict] = (), created_at=None) -> int:
+        """Create a session, optionally with its first messages, in one transaction. Returns its id."""
+        created = _timestamp(created_at)
+        with self._lock, self._conn:
+            cur = self._conn.execute("INSERT INTO sessions (name, created_at, updated_at) VALUES (?, ?, ?)",
+                                     (name, created, created))
+            session_id = cur.lastrowid
+            self._insert_messages(session_id, messages)
+        return session_id
+
+    def append_message(self, session_id: int, role: str, content: str, timestamp=None) -> None:
+        with self._lock, self._conn:
+            self._insert_messages(session_id, [{"role": role, "content": content, "timestamp": timestamp}])
+
+    def list_sessions(self, limit: int = 20, offset: int = 0) -> List[Dict]:
+        """Saved sessions, most recently updated first, without their messages."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(SESSION_COLUMNS)} FROM sessions WHERE deleted_at IS NULL"
+                " ORDER BY updated_at DESC, id DESC LIMIT ? OFFSET ?", (limit, offset)
+            ).fetchall()
+        return [dict(zip(SESSION_COLUMNS, r)) for r in rows]
+
+    def count_sessions(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions WHERE deleted_at IS NULL").fetchone()[0]
+
+    def get_session(self, session_id: int) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(SESSION_COLUMNS)} FROM sessions WHERE id = ? AND deleted_at IS NULL", (session_id,)
+            ).fetchone()
+        return dict(zip(SESSION_COLUMNS, row)) if row else None
+
+    def get_messages(self, session_id: int, limit: Optional[int] = None, before_id: Optional[int] = None) -> List[Dict]:
+        """Messages of a session in order; with limit, the newest `limit` ones (before before_id)."""
+        sql = f"SELECT {', '.join(MESSAGE_COLUMNS)} FROM messages WHERE session_id = ?"
+        params: list = [session_id]
+        if before_id is not None:
+            sql += " AND id < ?"
+            params.append(before_id)
+        if limit is not None:
+            sql += " ORDER BY id DESC LIMIT ?"
+            params.append(limit)
+        else:
+            sql += " ORDER BY id"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        if limit is not None:
+            rows.reverse()
+        return [dict(zip(MESSAGE_COLUMNS, r)) for r in rows]
+
+    def delete_session(self, session_id: int) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE sessions SET deleted_at = ? WHERE id = ?", (time.time(), session_id))
+
+    def import_json(self, path) -> int:
+        """Import sessions from the old chat_sessions.json once per file. Returns the number imported."""
+        path = Path(path)
+        key = f"imported:{path.resolve()}"
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+                return 0
+        if not path.exists():
+            return 0
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return 0
+        sessions = data if isinstance(data, list) else []
+        with self._lock, self._conn:
+            # take the write lock before re-checking, so two processes cannot both import
+            self._conn.execute("BEGIN IMMEDIATE")
+            if self._conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+                return 0
+            for sess in sessions:
+                created = _timestamp(sess.get("timestamp"))
+                cur = self._conn.execute("INSERT INTO sessions (name, created_at, updated_at) VALUES (?, ?, ?)",
+                                         (sess.get("name") or "Imported chat", created, created))
+                self._insert_messages(cur.lastrowid, sess.get("messages") or [])
+                self._conn.execute("UPDATE sessions SET updated_at = ? WHERE id = ?", (created, cur.lastrowid))
+            self._conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (key, str(time.time())))
+        return len(sessions)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+__all__ = ["ChatStore"]
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect the chat store or import an old chat_sessions.json.")
+    parser.add_argument("--db", default=str(Path(__file__).resolve().parent / "chat_sessions.sqlite3"))
+    parser.add_argument("--import", dest="import_path", default=None, help="chat_sessions.json to import once")
+    args = parser.parse_args()
+
+    store = ChatStore(args.db)
+    if args.import_path:
+        print(f"Imported {store.import_json(args.import_path)} session(s) from {args.import_path}")
+    print(f"{store.count_sessions()} saved session(s)")
+    for sess in store.list_sessions(limit=10):
+        print(f"  #{sess['id']} {sess['name']}: {sess['message_count']} messages")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Token-budgeted context assembly for the answer prompt.
+
+From a pool of retrieved chunks it drops near-duplicates (e.g. the same slide from a
+re-uploaded file), picks up to k chunks by maximal marginal relevance so the context
+covers different parts of the corpus, merges chunks of the same source whose text
+overlaps (the splitter repeats up to 200 characters between neighbours) and packs the
+result up to a token budget.
+"""
+
+import os
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# prompt tokens spent on retrieved context; on the free tier the tokens/min limit, not the
+# context window, is what runs out first, so the budget follows each model's limit
+DEFAULT_TOKEN_BUDGET = int(os.getenv("BRALMA_CONTEXT_TOKENS", "2000"))
+MODEL_TOKEN_BUDGETS: Dict[str, int] = {
+    "llama-3.3-70b-versatile": DEFAULT_TOKEN_BUDGET,
+    "openai/gpt-oss-20b": min(DEFAULT_TOKEN_BUDGET, 1500),
+}
+MMR_LAMBDA = 0.7
+DUPLICATE_SIMILARITY = 0.95
+MIN_OVERLAP_CHARS = 40
+BLOCK_PREFIX = "--- Source: "
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), good enough for budgeting."""
+    return len(text) // 4 + 1
+
+
+def token_budget_for(model: Optional[str] = None) -> int:
+    return MODEL_TOKEN_BUDGETS.get(model, DEFAULT_TOKEN_BUDGET) if model else DEFAULT_TOKEN_BUDGET
+
+
+def _overlap(a: str, b: str) -> int:
+    """Length of the longest suffix of a that is a prefix of b (0 below MIN_OVERLAP_CHARS)."""
+    probe = b[:MIN_OVERLAP_CHARS]
+    if len(probe) < MIN_OVERLAP_CHARS:
+        return 0
+    start = a.find(probe, max(0, len(a) - len(b)))
+    while start != -1:
+        if b.startswith(a[start:]):
+            return len(a) - start
+        start = a.find(probe, start + 1)
+    return 0
+
+
+def merge_text(a: str, b: str) -> Optional[str]:
+    """a and b joined without their shared text, or None when they do not overlap."""
+    if b in a:
+        return a
+    if a in b:
+        return b
+    n = _overlap(a, b)
+    if n:
+        return a + b[n:]
+    n = _overlap(b, a)
+    if n:
+        return b + a[n:]
+    return None
+
+
+def rank_relevance(n: int) -> np.ndarray:
+    """Relevance from 1 (best) down to 0 by rank; hit scores are not comparable across retrieval modes."""
+    return 1 - np.arange(n, dtype=np.float32) / max(n - 1, 1)
+
+
+def select_mmr(relevance: Sequence[float], vectors: np.ndarray, k: int, lambda_: float = MMR_LAMBDA,
+               duplicate_similarity: float = DUPLICATE_SIMILARITY) -> List[int]:
+    """Indices of up to k items by maximal marginal relevance, skipping near-duplicates of picked ones."""
+    if not len(relevance):
+        return []
+    rel = np.asarray(relevance, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    unit = vectors / np.where(norms == 0, 1, norms)
+    sims = unit @ unit.T
+    picked: List[int] = []
+    candidates = list(range(len(rel)))
+    while candidates and len(picked) < k:
+        if picked:
+            redundancy = sims[np.ix_(candidates, picked)].max(axis=1)
+            scores = lambda_ * rel[candidates] - (1 - lambda_) * redundancy
+        else:
+            redundancy = np.zeros(len(candidates))
+            scores = rel[candidates]
+        best = int(np.argmax(scores))
+        choice = candidates.pop(best)
+        if redundancy[best] >= duplicate_similarity:
+            continue  # near-duplicate of a chunk already in the context
+        picked.append(choice)
+    return picked
+
+
+def _merge_parts(parts: List[Dict]) -> List[Dict]:
+    """Merge parts of the same source until no two of them overlap; keeps the first part's position."""
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(parts)):
+            for j in range(i + 1, len(parts)):
+                if parts[i]["source"] != parts[j]["source"]:
+                    continue
+                text = merge_text(parts[i]["text"], parts[j]["text"])
+                if text is None:
+                    continue
+                parts[i] = {"source": parts[i]["source"], "text": text,
+                            "score": parts[i]["score"],  # i ranks higher
+                            "chunks": parts[i]["chunks"] + parts[j]["chunks"]}
+                del parts[j]
+                merged = True
+                break
+            if merged:
+                break
+    return parts
+
+
+def build_context(hits: List[Dict], vectors: Sequence[Sequence[float]], k: int = 4,
+                  token_budget: int = DEFAULT_TOKEN_BUDGET, lambda_: float = MMR_LAMBDA) -> Dict:
+    """Assemble the context string from retrieved hits (best first) and their embeddings.
+
+    Returns {"context", "tokens", "chunks_in", "chunks_used", "parts"}.
+    """
+    if not hits:
+        return {"context": "", "tokens": 0, "chunks_in": 0, "chunks_used": 0, "parts": 0}
+    picked = select_mmr(rank_relevance(len(hits)), np.asarray(vectors, dtype=np.float32), k, lambda_)
+    parts = _merge_parts([
+        {"source": hits[i].get("metadata", {}).get("source", "unknown"), "text": hits[i].get("page_content", ""),
+         "score": float(hits[i].get("score", 0.0)), "chunks": 1}
+        for i in picked
+    ])
+
+    blocks, used_tokens, used_chunks = [], 0, 0
+    for part in parts:
+        header = (f"{BLOCK_PREFIX}{part['source']} | Chunk {len(blocks) + 1} | Score: {part['score']:.4f} ---\n")
+        text = part["text"]
+        cost = estimate_tokens(header + text)
+        if used_tokens + cost > token_budget:
+            if blocks:
+                continue  # a smaller part further down may still fit
+            # the single best part is larger than the budget: keep its beginning
+            text = text[:max(0, (token_budget - estimate_tokens(header)) * 4)]
+            cost = estimate_tokens(header + text)
+        blocks.append(f"{header}{text}\n")
+        used_tokens += cost
+        used_chunks += part["chunks"]
+    return {"context": "\n".join(blocks), "tokens": used_tokens, "chunks_in": len(hits),
+            "chunks_used": used_chunks, "parts": len(blocks)}
+
+
+def trim_context(context: str, token_budget: int) -> str:
+    """The leading parts of a built context that fit in token_budget, e.g. for a model with a smaller budget."""
+    if estimate_tokens(context) <= token_budget:
+        return context
+    blocks = context.split(f"\n{BLOCK_PREFIX}")
+    kept = blocks[0][:max(0, token_budget * 4)]  # the first part alone may be over budget
+    for block in blocks[1:]:
+        candidate = f"{kept}\n{BLOCK_PREFIX}{block}"
+        if estimate_tokens(candidate) > token_budget:
+            break
+        kept = candidate
+    return kept
+
+
+__all__ = ["build_context", "trim_context", "select_mmr", "merge_text", "rank_relevance", "estimate_tokens",
+           "token_budget_for", "DEFAULT_TOKEN_BUDGET", "MODEL_TOKEN_BUDGETS"]
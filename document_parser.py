@@ -0,0 +1,196 @@
+"""
+Document parsing for ingestion: loading PDF/PPTX pages, hashing and splitting.
+
+Kept free of the embedding model and Chroma so it can run in process-pool workers.
+A parsed page is a plain dict: {"text": str, "metadata": dict, "chunks": list[str] | None}.
+"""
+
+import hashlib
+import os
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from embedding_cache import normalize_text
+from pptx_extractor import extract_slides
+from worker_pool import discard_pool, get_pool
+
+
+SUPPORTED_EXTENSIONS = (".pdf", ".pptx")
+
+# PDFs of at least PARALLEL_MIN_PAGES pages are extracted and split by a process pool, one
+# contiguous page range per task; smaller ones are not worth shipping to another process
+PDF_WORKERS = int(os.getenv("BRALMA_PDF_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+PARALLEL_MIN_PAGES = int(os.getenv("BRALMA_PDF_PARALLEL_PAGES", "150"))
+PAGES_PER_TASK = 25
+
+# in pool workers: (shared memory name, opened document) of the PDF being extracted
+_worker_doc: Optional[Tuple[str, object]] = None
+
+splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def split_text(text: str) -> List[str]:
+    return splitter.split_text(text)
+
+
+def load_pages_from_path(path: str) -> List[Dict]:
+    """Load a PDF or PPTX file into one page record per page or slide."""
+    if Path(path).suffix.lower() == '.pptx':
+        return extract_slides(str(path), Path(path).name)
+
+    from langchain_community.document_loaders import PyMuPDFLoader
+
+    loader = PyMuPDFLoader(str(path))
+    return [{"text": d.page_content, "metadata": dict(d.metadata or {}), "chunks": None} for d in loader.load()]
+
+
+def _pdf_page(doc, doc_meta: Dict, filename: str, index: int) -> Dict:
+    metadata = dict(doc_meta, source=filename, file_path=filename, page=index, total_pages=doc.page_count)
+    return {"text": doc.load_page(index).get_text(), "metadata": metadata, "chunks": None}
+
+
+def _pdf_metadata(doc) -> Dict:
+    return {k: v for k, v in (doc.metadata or {}).items() if isinstance(v, (str, int, float, bool))}
+
+
+def iter_pdf_pages(file_bytes: bytes, filename: str) -> Iterator[Dict]:
+    """Yield PDF pages lazily, straight from the in-memory buffer (no temporary file).
+
+    Page text and metadata match PyMuPDFLoader, but only one page is materialized at a time.
+    """
+    import fitz  # PyMuPDF
+
+    with fitz.open(stream=file_bytes, filetype="pdf") as doc:
+        doc_meta = _pdf_metadata(doc)
+        for i in range(doc.page_count):
+            yield _pdf_page(doc, doc_meta, filename, i)
+
+
+def pdf_page_count(file_bytes: bytes) -> int:
+    import fitz  # PyMuPDF
+
+    with fitz.open(stream=file_bytes, filetype="pdf") as doc:
+        return doc.page_count
+
+
+def _worker_pdf(shm_name: str, size: int):
+    """The PDF in shared memory segment shm_name, opened once per pool worker and kept for its later ranges."""
+    global _worker_doc
+    if _worker_doc is None or _worker_doc[0] != shm_name:
+        import fitz  # PyMuPDF
+
+        if _worker_doc is not None:
+            _worker_doc[1].close()
+        shm = shared_memory.SharedMemory(name=shm_name)
+        try:
+            data = bytes(shm.buf[:size])
+        finally:
+            shm.close()
+        _worker_doc = (shm_name, fitz.open(stream=data, filetype="pdf"))
+    return _worker_doc[1]
+
+
+def _extract_pdf_range(shm_name: str, size: int, filename: str, start: int, stop: int) -> List[Dict]:
+    """Pages start..stop-1 of a PDF in shared memory, extracted and already split. Runs inside pool workers."""
+    doc = _worker_pdf(shm_name, size)
+    doc_meta = _pdf_metadata(doc)
+    pages = [_pdf_page(doc, doc_meta, filename, i) for i in range(start, min(stop, doc.page_count))]
+    for page in pages:
+        page["chunks"] = split_text(page["text"])
+    return pages
+
+
+def iter_pdf_pages_parallel(file_bytes: bytes, filename: str, workers: int = PDF_WORKERS) -> Iterator[Dict]:
+    """Like iter_pdf_pages, but page ranges are extracted and split by a process pool.
+
+    The buffer is shared with the workers through shared memory, not pickled to every task
+    or written to disk. Only `workers` ranges of PAGES_PER_TASK pages are in flight, so
+    memory stays flat as with the serial path. Ranges are yielded in page order, so chunk
+    order and page metadata match the serial path; pages come with their chunks filled in.
+    """
+    total = pdf_page_count(file_bytes)
+    starts = iter(range(0, total, PAGES_PER_TASK))
+    shm = shared_memory.SharedMemory(create=True, size=len(file_bytes))
+    pending: Deque[Future] = deque()
+    pool = get_pool(workers)
+    try:
+        shm.buf[:len(file_bytes)] = file_bytes
+
+        def submit_next() -> None:
+            start = next(starts, None)
+            if start is not None:
+                pending.append(pool.submit(_extract_pdf_range, shm.name, len(file_bytes), filename, start,
+                                           start + PAGES_PER_TASK))
+
+        for _ in range(workers):
+            submit_next()
+        while pending:
+            pages = pending.popleft().result()
+            submit_next()
+            yield from pages
+    except BrokenProcessPool:
+        discard_pool(pool)
+        raise
+    finally:
+        for future in pending:
+            future.cancel()
+        shm.close()
+        shm.unlink()
+
+
+def iter_pages(file_bytes: bytes, filename: str, workers: Optional[int] = None) -> Iterator[Dict]:
+    """Lazily yield the pages of an uploaded document.
+
+    PDFs of at least PARALLEL_MIN_PAGES pages go through iter_pdf_pages_parallel when more
+    than one worker is available (workers defaults to PDF_WORKERS).
+    """
+    workers = PDF_WORKERS if workers is None else workers
+    if Path(filename).suffix.lower() == '.pptx':
+        yield from extract_slides(file_bytes, filename)
+    elif workers > 1 and pdf_page_count(file_bytes) >= PARALLEL_MIN_PAGES:
+        yield from iter_pdf_pages_parallel(file_bytes, filename, workers)
+    else:
+        yield from iter_pdf_pages(file_bytes, filename)
+
+
+def parse_file(path: str, source: Optional[str] = None) -> Dict:
+    """Read, hash, load and split one file. Runs inside bulk-ingest pool workers.
+
+    source is the name its chunks are stored under (default: the file name).
+    """
+    data = Path(path).read_bytes()
+    pages = load_pages_from_path(path)
+    for page in pages:
+        page["chunks"] = split_text(page["text"])
+    return {"path": str(path), "filename": source or Path(path).name, "doc_hash": hash_bytes(data), "pages": pages}
+
+
+__all__ = [
+    "splitter",
+    "hash_bytes",
+    "hash_text",
+    "split_text",
+    "load_pages_from_path",
+    "iter_pdf_pages",
+    "iter_pdf_pages_parallel",
+    "iter_pages",
+    "pdf_page_count",
+    "parse_file",
+    "SUPPORTED_EXTENSIONS",
+    "PDF_WORKERS",
+    "PARALLEL_MIN_PAGES",
+]
@@ -0,0 +1,73 @@
+"""
+Pluggable CPU embedding backends for all-MiniLM-L6-v2.
+
+"torch" is the existing fp32 PyTorch path (SentenceTransformerEmbeddings). "onnx-int8"
+runs the same model through ONNX Runtime with the int8-quantized export that ships with
+the model on the Hugging Face hub. Both take a thread count and batch size; if the ONNX
+runtime (or the quantized file) is unavailable, make_embeddings falls back to "torch".
+
+"onnx-int8" needs the optional requirements (sentence-transformers>=3.2, optimum[onnxruntime]):
+
+    pip install -r requirements-onnx.txt
+"""
+
+from typing import List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+BACKENDS = ("torch", "onnx-int8")
+ONNX_INT8_FILE = "onnx/model_qint8_avx2.onnx"
+
+
+class OnnxInt8Embeddings(Embeddings):
+    """sentence-transformers model served by ONNX Runtime with int8 weights."""
+
+    def __init__(self, model_name: str, threads: Optional[int] = None, batch_size: int = 32,
+                 file_name: str = ONNX_INT8_FILE):
+        import onnxruntime
+        from sentence_transformers import SentenceTransformer
+
+        session_options = onnxruntime.SessionOptions()
+        if threads:
+            session_options.intra_op_num_threads = threads
+            session_options.inter_op_num_threads = 1
+        self.batch_size = batch_size
+        self.model = SentenceTransformer(
+            model_name,
+            device="cpu",
+            backend="onnx",
+            model_kwargs={"file_name": file_name, "provider": "CPUExecutionProvider", "session_options": session_options},
+        )
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        texts = [t.replace("\n", " ") for t in texts]
+        return self.model.encode(texts, batch_size=self.batch_size, show_progress_bar=False).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def _torch_embeddings(model_name: str, threads: Optional[int], batch_size: int) -> Embeddings:
+    from langchain_community.embeddings import SentenceTransformerEmbeddings
+
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+    return SentenceTransformerEmbeddings(model_name=model_name, encode_kwargs={"batch_size": batch_size})
+
+
+def make_embeddings(model_name: str, backend: str = "torch", threads: Optional[int] = None,
+                    batch_size: int = 32) -> Tuple[Embeddings, str]:
+    """Build embeddings for backend. Returns (embeddings, backend actually used)."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {backend!r} (expected one of {BACKENDS})")
+    if backend == "onnx-int8":
+        try:
+            return OnnxInt8Embeddings(model_name, threads=threads, batch_size=batch_size), backend
+        except Exception as e:
+            print(f"ONNX int8 embedding backend unavailable ({e}); falling back to torch. "
+                  "Install its dependencies with: pip install -r requirements-onnx.txt")
+    return _torch_embeddings(model_name, threads, batch_size), "torch"
+
+
+__all__ = ["BACKENDS", "OnnxInt8Embeddings", "make_embeddings"]
@@ -1,45 +1,118 @@
-from dotenv import load_dotenv
-from groq import Groq
-import os
+from concurrent.futures import Future, ThreadPoolExecutor
+import contextvars
+from groq_client import get_client
+from groq_scheduler import PRIORITY_ANSWER, scheduler
+import tracing
 
-load_dotenv()
+ANSWER_MODEL = "llama-3.3-70b-versatile"
+# returned (or streamed) in place of an answer; callers must not cache it
+MISSING_KEY_MESSAGE = "GROQ API key is missing!"
 
-groq_key = os.getenv("GROQ_API_KEY")
+# Shared pool for running the answer and quiz completions side by side
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="groq")
 
-if not groq_key:
-    print("GROQ API key is missing!")
-else:
-    print("GROQ key found!")
 
-def answer_with_context(question, context=""):
-    if not groq_key:
-        return "GROQ API key is missing!"
-    client = Groq(api_key=groq_key)
+def _answer_prompt(question, context=""):
     if context:
-        prompt = (
+        return (
             "Answer in the spoken language. \n\n"
             f"Context:\n{context}\n\n"
             f"User question:\n{question}\n\n"
             "Use the context if it is relevant to the user question!!"
             "Make lists or bullet points clear, each with their own line."
         )
-    else:
-        prompt = (
-            f"Answer in the spoken language:\n{question}\n\n"
-        )
-    answer_completion = client.chat.completions.create(
-        messages=[{"role": "user", "content": prompt}],
-        model="llama-3.3-70b-versatile",
+    return (
+        f"Answer in the spoken language:\n{question}\n\n"
     )
+
+
+def answer_with_context(question, context=""):
+    client = get_client()
+    if client is None:
+        return MISSING_KEY_MESSAGE
+    with tracing.span("groq.completion", model=ANSWER_MODEL, kind="answer") as span:
+        answer_completion = scheduler.complete(
+            client, ANSWER_MODEL, [{"role": "user", "content": _answer_prompt(question, context)}],
+            priority=PRIORITY_ANSWER,
+        )
+        usage = getattr(answer_completion, "usage", None)
+        if usage is not None:
+            span.set(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
     answer = answer_completion.choices[0].message.content
     return answer
 
-def answer_and_maybe_quiz(question, context=""):
+
+def stream_answer_with_context(question, context=""):
+    """Yield the answer token by token using Groq's streaming completions."""
+    client = get_client()
+    if client is None:
+        yield MISSING_KEY_MESSAGE
+        return
+    with tracing.span("groq.completion", model=ANSWER_MODEL, kind="answer", stream=True) as span:
+        stream = scheduler.stream(
+            client, ANSWER_MODEL, [{"role": "user", "content": _answer_prompt(question, context)}],
+            priority=PRIORITY_ANSWER,
+        )
+        for chunk in stream:
+            # Groq reports usage on the last chunk
+            usage = getattr(getattr(chunk, "x_groq", None), "usage", None)
+            if usage is not None:
+                span.set(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+
+
+def start_quiz(question, context=""):
+    """Start quiz generation from the retrieved context in the background.
+
+    Returns a Future with the quiz text ("" when not relevant), or None without context.
+    """
+    if not context:
+        return None
+    from groq_quiz_llm import generate_quiz_from_context
+    # copy the context so the quiz call is traced under the caller's request id
+    return _executor.submit(contextvars.copy_context().run, generate_quiz_from_context, question, context)
+
+
+def answer_with_lazy_quiz(question, context=""):
+    """Return the answer as soon as it is ready, plus a Future for the quiz.
+
+    The quiz is generated concurrently with the answer, so it is usually done (or close)
+    by the time the answer has been shown.
+    """
+    quiz_future = start_quiz(question, context)
     answer = answer_with_context(question, context)
-    quiz = ""
-    if context:
-        from groq_quiz_llm import generate_quiz
-        quiz = generate_quiz(answer)
+    return answer, quiz_future
+
+
+def quiz_result(quiz_future: Future, timeout=None):
+    """Quiz text from a Future returned by start_quiz; errors yield no quiz."""
+    if quiz_future is None:
+        return ""
+    try:
+        return quiz_future.result(timeout=timeout)
+    except Exception:
+        return ""
+
+
+def stream_answer_and_maybe_quiz(question, context=""):
+    """Stream the answer, then yield the quiz (started concurrently) once it is ready.
+
+    Joined together the pieces equal answer_and_maybe_quiz's output.
+    """
+    quiz_future = start_quiz(question, context)
+    yield from stream_answer_with_context(question, context)
+    quiz = quiz_result(quiz_future)
+    if quiz:
+        yield f"\n{quiz}"
+
+
+def answer_and_maybe_quiz(question, context=""):
+    answer, quiz_future = answer_with_lazy_quiz(question, context)
+    quiz = quiz_result(quiz_future)
     if quiz:
         return f"{answer}\n{quiz}"
     else:
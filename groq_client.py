@@ -0,0 +1,37 @@
+from typing import Optional
+import threading
+import os
+
+_client = None
+_client_lock = threading.Lock()
+_env_loaded = False
+
+
+def get_api_key() -> Optional[str]:
+    """GROQ_API_KEY from the environment, loading .env on first call."""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+    return os.getenv("GROQ_API_KEY")
+
+
+def get_client():
+    """Return the process-wide Groq client, or None when no API key is configured.
+
+    The client keeps a pooled HTTP connection and is safe to share between threads, so
+    answer and quiz calls reuse it instead of building Groq(api_key=...) on every call.
+    The groq package is only imported on first use.
+    """
+    global _client
+    if _client is None:
+        groq_key = get_api_key()
+        if not groq_key:
+            return None
+        with _client_lock:
+            if _client is None:
+                from groq import Groq
+                # retries and backoff are handled by groq_scheduler
+                _client = Groq(api_key=groq_key, max_retries=0)
+    return _client
@@ -1,31 +1,48 @@
-from dotenv import load_dotenv
-from groq import Groq
-import os
+from context_builder import token_budget_for, trim_context
+from groq_client import get_client
+from groq_scheduler import PRIORITY_QUIZ, scheduler
+import tracing
 
-load_dotenv()
+QUIZ_MODEL = "openai/gpt-oss-20b"
 
-groq_key = os.getenv("GROQ_API_KEY")
+quiz_prompt = (
+    "Based on the user's question and the provided context, decide whether a quiz"
+    "would be relevant.\n\n"
+    "If relevant: generate 5 short quiz questions in the spoken language. No answers. List them from 1 to 5.\n"
+    "Make sure that a quiz actually helps the user to understand to topic better. Do quizes when you talk about information"
+    "DO not say that the user asked for a quiz, just provide it at the end. Give the quize the title ## Quiz"
+    "If not relevant: return ONLY the word: NONE"
+)
 
-def generate_quiz(answer):
-    if not groq_key:
+
+def _complete_quiz(messages):
+    client = get_client()
+    if client is None:
         return ""
-    client = Groq(api_key=groq_key)
-    quiz_prompt = (
-        "Based on the user's question and the provided context, decide whether a quiz"
-        "would be relevant.\n\n"
-        "If relevant: generate 5 short quiz questions in the spoken language. No answers. List them from 1 to 5.\n"
-        "Make sure that a quiz actually helps the user to understand to topic better. Do quizes when you talk about information"
-        "DO not say that the user asked for a quiz, just provide it at the end. Give the quize the title ## Quiz"
-        "If not relevant: return ONLY the word: NONE"
-    )
-    quiz_completion = client.chat.completions.create(
-        messages=[
-            {"role": "assistant", "content": answer},
-            {"role": "user", "content": quiz_prompt},
-        ],
-        model="openai/gpt-oss-20b",
-    )
+    with tracing.span("groq.completion", model=QUIZ_MODEL, kind="quiz") as span:
+        quiz_completion = scheduler.complete(client, QUIZ_MODEL, messages, priority=PRIORITY_QUIZ)
+        usage = getattr(quiz_completion, "usage", None)
+        if usage is not None:
+            span.set(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
     quiz = quiz_completion.choices[0].message.content.strip()
     if quiz.upper() == "NONE":
         return ""
     return quiz
+
+
+def generate_quiz(answer):
+    return _complete_quiz([
+        {"role": "assistant", "content": answer},
+        {"role": "user", "content": quiz_prompt},
+    ])
+
+
+def generate_quiz_from_context(question, context):
+    """Quiz built from the retrieved context, so it can run while the answer is generated.
+
+    The context is built for the answer model; it is cut down to the quiz model's budget.
+    """
+    context = trim_context(context, token_budget_for(QUIZ_MODEL))
+    return _complete_quiz([
+        {"role": "user", "content": f"Context:\n{context}\n\nUser question:\n{question}\n\n{quiz_prompt}"},
+    ])
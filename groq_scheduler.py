@@ -0,0 +1,308 @@
+"""
+Shared scheduler for all Groq chat completions made by this process.
+
+Every call waits for a slot under per-model token buckets (requests/min and tokens/min),
+a global concurrency cap and a priority order, so answers go out before quizzes when the
+rate limit is tight. Rate-limit (429), 5xx and connection errors are retried with
+jittered exponential backoff that honours Retry-After; a 429 also pauses that model's
+bucket for everyone. Identical non-streaming requests that are already in flight are
+coalesced into one call.
+
+    completion = scheduler.complete(client, model, messages, priority=PRIORITY_ANSWER)
+    for chunk in scheduler.stream(client, model, messages):
+        ...
+"""
+
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+import tracing
+
+PRIORITY_ANSWER = 0
+PRIORITY_QUIZ = 10
+
+# Groq free-tier limits; raise them for paid keys with configure() or the env overrides
+DEFAULT_LIMITS: Dict[str, Tuple[int, int]] = {
+    "llama-3.3-70b-versatile": (30, 12000),
+    "openai/gpt-oss-20b": (30, 8000),
+}
+FALLBACK_LIMITS = (30, 6000)
+MAX_CONCURRENCY = int(os.getenv("BRALMA_GROQ_CONCURRENCY", "4"))
+MAX_RETRIES = int(os.getenv("BRALMA_GROQ_RETRIES", "4"))
+REQUEST_TIMEOUT = float(os.getenv("BRALMA_GROQ_TIMEOUT", "60"))
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 20.0
+# completion tokens assumed before the real usage is known
+COMPLETION_ESTIMATE = 512
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = ("APIConnectionError", "APITimeoutError", "InternalServerError", "RateLimitError")
+
+
+def estimate_tokens(messages: List[Dict]) -> int:
+    """Rough prompt size (~4 characters per token) plus the assumed completion."""
+    chars = sum(len(str(m.get("content") or "")) for m in messages)
+    return chars // 4 + COMPLETION_ESTIMATE
+
+
+class TokenBucket:
+    """Continuously refilling bucket; `level` may go negative when actual usage exceeds the estimate."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` can be taken (0 when available now)."""
+        self._refill(now)
+        if now < self.paused_until:
+            return self.paused_until - now
+        # a request larger than the bucket only waits for a full bucket
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.level -= amount
+
+    def adjust(self, delta: float) -> None:
+        self.level = min(self.capacity, self.level - delta)
+
+
+class _ModelLimiter:
+    def __init__(self, rpm: int, tpm: int):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+
+    def wait_time(self, tokens: int, now: float) -> float:
+        return max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+
+    def take(self, tokens: int) -> None:
+        self.requests.take(1)
+        self.tokens.take(tokens)
+
+    def pause(self, until: float) -> None:
+        self.requests.paused_until = max(self.requests.paused_until, until)
+
+
+class _Ticket:
+    __slots__ = ("priority", "seq", "model", "tokens", "enqueued")
+
+    def __init__(self, priority: int, seq: int, model: str, tokens: int):
+        self.priority = priority
+        self.seq = seq
+        self.model = model
+        self.tokens = tokens
+        self.enqueued = time.monotonic()
+
+    def __lt__(self, other: "_Ticket") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+def _status_code(exc: Exception) -> Optional[int]:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _is_retryable(exc: Exception) -> bool:
+    status = _status_code(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return type(exc).__name__ in RETRYABLE_ERRORS
+
+
+class GroqScheduler:
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY, max_retries: int = MAX_RETRIES,
+                 timeout: float = REQUEST_TIMEOUT):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self._limits: Dict[str, _ModelLimiter] = {}
+        self._waiting: List[_Ticket] = []
+        self._inflight = 0
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._coalesce: Dict[str, Future] = {}
+        self._coalesce_lock = threading.Lock()
+        self._metrics = {"submitted": 0, "completed": 0, "errors": 0, "retries": 0, "rate_limited": 0,
+                         "coalesced": 0, "wait_ms_total": 0.0}
+
+    def configure(self, model: str, rpm: int, tpm: int) -> None:
+        """Set the requests/min and tokens/min limits for one model."""
+        with self._cond:
+            self._limits[model] = _ModelLimiter(rpm, tpm)
+            self._cond.notify_all()
+
+    def _limiter(self, model: str) -> _ModelLimiter:
+        limiter = self._limits.get(model)
+        if limiter is None:
+            rpm, tpm = DEFAULT_LIMITS.get(model, FALLBACK_LIMITS)
+            limiter = self._limits[model] = _ModelLimiter(
+                int(os.getenv("BRALMA_GROQ_RPM", rpm)), int(os.getenv("BRALMA_GROQ_TPM", tpm)))
+        return limiter
+
+    def _admit(self, model: str, tokens: int, priority: int) -> None:
+        """Block until this request may be sent: a free slot, budget for its model and no better-placed waiter."""
+        ticket = _Ticket(priority, next(self._seq), model, tokens)
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            self._metrics["submitted"] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = None  # None: sleep until another request is admitted or released
+                    if self._inflight < self.max_concurrency:
+                        for other in sorted(self._waiting):
+                            other_wait = self._limiter(other.model).wait_time(other.tokens, now)
+                            if other is ticket:
+                                wait = other_wait
+                                break
+                            if other_wait == 0:
+                                # a better-placed waiter that can go now keeps its turn
+                                break
+                    if wait == 0:
+                        break
+                    self._cond.wait(timeout=wait)
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._limiter(model).take(tokens)
+                self._inflight += 1
+                self._cond.notify_all()
+                self._metrics["wait_ms_total"] += (time.monotonic() - ticket.enqueued) * 1000
+            except BaseException:
+                if ticket in self._waiting:
+                    self._waiting.remove(ticket)
+                    heapq.heapify(self._waiting)
+                self._cond.notify_all()
+                raise
+
+    def _release(self, model: str, estimated: int, actual: Optional[int], ok: bool) -> None:
+        with self._cond:
+            self._inflight -= 1
+            if actual is not None:
+                self._limiter(model).tokens.adjust(actual - estimated)
+            self._metrics["completed" if ok else "errors"] += 1
+            self._cond.notify_all()
+
+    def _backoff(self, model: str, attempt: int, exc: Exception) -> None:
+        retry_after = _retry_after(exc)
+        delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+        with self._cond:
+            self._metrics["retries"] += 1
+            if _status_code(exc) == 429:
+                self._metrics["rate_limited"] += 1
+                if retry_after is not None:
+                    # everyone waiting on this model backs off, not just us
+                    self._limiter(model).pause(time.monotonic() + retry_after)
+        time.sleep(max(delay, retry_after or 0.0))
+
+    def _call(self, client, model: str, messages: List[Dict], priority: int, stream: bool, **kwargs):
+        estimated = estimate_tokens(messages)
+        timeout = kwargs.pop("timeout", self.timeout)
+        attempt = 0
+        while True:
+            self._admit(model, estimated, priority)
+            try:
+                result = client.chat.completions.create(messages=messages, model=model, stream=stream,
+                                                        timeout=timeout, **kwargs)
+            except Exception as exc:
+                self._release(model, estimated, None, ok=False)
+                if attempt >= self.max_retries or not _is_retryable(exc):
+                    raise
+                self._backoff(model, attempt, exc)
+                attempt += 1
+                continue
+            return result, estimated
+
+    def complete(self, client, model: str, messages: List[Dict], priority: int = PRIORITY_ANSWER, **kwargs):
+        """Scheduled non-streaming completion; identical in-flight requests share one call."""
+        key = hashlib.sha256(json.dumps([model, messages, kwargs], sort_keys=True, default=str).encode()).hexdigest()
+        with self._coalesce_lock:
+            pending = self._coalesce.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._coalesce[key] = Future()
+            else:
+                self._metrics["coalesced"] += 1
+        if not owner:
+            return pending.result()
+
+        try:
+            with tracing.span("groq.queue", model=model, priority=priority):
+                completion, estimated = self._call(client, model, messages, priority, stream=False, **kwargs)
+            usage = getattr(completion, "usage", None)
+            self._release(model, estimated, getattr(usage, "total_tokens", None), ok=True)
+            pending.set_result(completion)
+            return completion
+        except BaseException as exc:
+            pending.set_exception(exc)
+            raise
+        finally:
+            with self._coalesce_lock:
+                self._coalesce.pop(key, None)
+
+    def stream(self, client, model: str, messages: List[Dict], priority: int = PRIORITY_ANSWER, **kwargs):
+        """Scheduled streaming completion; only opening the stream is retried, not a half-read one."""
+        with tracing.span("groq.queue", model=model, priority=priority):
+            chunks, estimated = self._call(client, model, messages, priority, stream=True, **kwargs)
+        actual, ok = None, False
+        try:
+            for chunk in chunks:
+                usage = getattr(getattr(chunk, "x_groq", None), "usage", None)
+                if usage is not None:
+                    actual = usage.total_tokens
+                yield chunk
+            ok = True
+        finally:
+            self._release(model, estimated, actual, ok=ok)
+
+    def stats(self) -> Dict:
+        """Queue depth per model and priority, in-flight calls and retry/coalescing counters."""
+        with self._cond:
+            depth: Dict[str, int] = {}
+            for ticket in self._waiting:
+                key = f"{ticket.model}@{ticket.priority}"
+                depth[key] = depth.get(key, 0) + 1
+            admitted = self._metrics["submitted"] - len(self._waiting)
+            return {
+                "queue_depth": len(self._waiting),
+                "queue_by_model": depth,
+                "inflight": self._inflight,
+                **{k: v for k, v in self._metrics.items() if k != "wait_ms_total"},
+                "avg_wait_ms": self._metrics["wait_ms_total"] / admitted if admitted else 0.0,
+            }
+
+
+scheduler = GroqScheduler()
+
+
+__all__ = ["GroqScheduler", "TokenBucket", "scheduler", "estimate_tokens", "PRIORITY_ANSWER", "PRIORITY_QUIZ"]
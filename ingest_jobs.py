@@ -0,0 +1,201 @@
+"""
+Persistent background queue for document ingestion.
+
+Uploads are written to disk and recorded as jobs in a SQLite table; a small pool of
+worker threads (BRALMA_INGEST_WORKERS, default 1, so ingest never takes every core away
+from queries) claims them in order and runs the ingest function. Each job moves through
+
+    queued -> parsing -> embedding -> persisted   (or failed)
+
+with pages and chunks progress, so the UI can poll it while the user keeps chatting.
+Jobs survive restarts: a claimed job records its owner (one id per IngestQueue), and the
+owner's heartbeat thread renews the lease every HEARTBEAT_SECONDS while it runs. Only a
+job whose lease is older than LEASE_SECONDS, i.e. whose owner is gone, is put back in the
+queue, where any process sharing the database can pick it up.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+STATUSES = ("queued", "parsing", "embedding", "persisted", "failed")
+ACTIVE_STATUSES = ("queued", "parsing", "embedding")
+COLUMNS = ("id", "filename", "path", "status", "pages_done", "pages_total", "chunks_written", "error", "result",
+           "created_at", "updated_at", "owner", "heartbeat_at")
+DEFAULT_WORKERS = int(os.getenv("BRALMA_INGEST_WORKERS", "1"))
+HEARTBEAT_SECONDS = 10
+LEASE_SECONDS = 60
+POLL_SECONDS = 2.0
+
+
+class IngestQueue:
+    def __init__(self, path: str, upload_dir: str, ingest: Callable[..., Dict], workers: int = DEFAULT_WORKERS):
+        """ingest(file_bytes, filename, on_progress=callback) ingests one document and returns its stats."""
+        self.path = path
+        self.upload_dir = Path(upload_dir)
+        self.ingest = ingest
+        self.workers = workers
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self.upload_dir.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " filename TEXT NOT NULL,"
+                " path TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " pages_done INTEGER NOT NULL DEFAULT 0,"
+                " pages_total INTEGER,"
+                " chunks_written INTEGER NOT NULL DEFAULT 0,"
+                " error TEXT,"
+                " result TEXT,"
+                " created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " owner TEXT,"
+                " heartbeat_at REAL)"
+            )
+            present = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            for column, kind in (("owner", "TEXT"), ("heartbeat_at", "REAL")):
+                if column not in present:  # database created before leases
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)")
+
+    @staticmethod
+    def _row(row) -> Dict:
+        job = dict(zip(COLUMNS, row))
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def _update(self, job_id: str, **fields) -> None:
+        fields["updated_at"] = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE jobs SET {', '.join(f'{k} = ?' for k in fields)} WHERE id = ?",
+                               (*fields.values(), job_id))
+
+    def submit(self, file_bytes: bytes, filename: str) -> Dict:
+        """Store the upload and queue it. Returns the job."""
+        job_id = uuid.uuid4().hex[:16]
+        path = self.upload_dir / f"{job_id}_{Path(filename).name}"
+        path.write_bytes(file_bytes)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, filename, path, status, created_at, updated_at) VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, filename, str(path), now, now),
+            )
+        self.start()
+        self._wake.set()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {', '.join(COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row(row) if row else None
+
+    def list(self, limit: int = 20) -> List[Dict]:
+        """Most recent jobs first."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [self._row(r) for r in rows]
+
+    def active(self) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM jobs WHERE status IN ({', '.join('?' * len(ACTIVE_STATUSES))})"
+                " ORDER BY created_at", ACTIVE_STATUSES
+            ).fetchall()
+        return [self._row(r) for r in rows]
+
+    def _claim(self) -> Optional[Dict]:
+        """Atomically take the oldest queued job (or one whose owner stopped renewing its lease)."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute(
+                "UPDATE jobs SET status = 'queued', owner = NULL, updated_at = ?"
+                " WHERE status IN ('parsing', 'embedding') AND COALESCE(heartbeat_at, updated_at) < ?",
+                (now, now - LEASE_SECONDS)
+            )
+            row = self._conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE jobs SET status = 'parsing', owner = ?, heartbeat_at = ?, updated_at = ?"
+                               " WHERE id = ?", (self.owner, now, now, row[0]))
+        return self._row(row)
+
+    def _heartbeat(self) -> None:
+        """Renew the lease of the jobs this queue is running, however long a step takes."""
+        while True:
+            time.sleep(HEARTBEAT_SECONDS)
+            try:
+                with self._lock, self._conn:
+                    self._conn.execute(
+                        "UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND status IN ('parsing', 'embedding')",
+                        (time.time(), self.owner)
+                    )
+            except sqlite3.Error:
+                pass  # the next beat retries; a lease lasts several beats
+
+    def _run_job(self, job: Dict) -> None:
+        job_id = job["id"]
+
+        def on_progress(progress: Dict) -> None:
+            stage = "parsing" if progress.get("stage") == "parsing" else "embedding"
+            self._update(job_id, status=stage,
+                         pages_done=progress.get("pages_done", 0), pages_total=progress.get("pages_total"),
+                         chunks_written=progress.get("chunks_written", 0))
+
+        try:
+            file_bytes = Path(job["path"]).read_bytes()
+            result = self.ingest(file_bytes, job["filename"], on_progress=on_progress)
+        except Exception as e:
+            self._update(job_id, status="failed", error=f"{type(e).__name__}: {e}")
+        else:
+            self._update(job_id, status="persisted", result=json.dumps(result, default=str),
+                         pages_done=result.get("pages", 0), chunks_written=result.get("chunks_ingested", 0))
+        # a failed job is not retried, so its upload is not needed either way
+        Path(job["path"]).unlink(missing_ok=True)
+
+    def _worker(self) -> None:
+        while True:
+            job = self._claim()
+            if job is None:
+                self._wake.wait(POLL_SECONDS)
+                self._wake.clear()
+                continue
+            self._run_job(job)
+
+    def start(self) -> None:
+        """Start the worker threads once; queued jobs from earlier runs are picked up."""
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"ingest-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            heartbeat = threading.Thread(target=self._heartbeat, name="ingest-heartbeat", daemon=True)
+            heartbeat.start()
+            self._threads.append(heartbeat)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+__all__ = ["IngestQueue", "STATUSES", "ACTIVE_STATUSES"]
@@ -1,112 +1,721 @@
 import os
+import time
+import atexit
+import threading
 from pathlib import Path
-from typing import List, Dict
-from datetime import datetime
+from typing import TYPE_CHECKING, Callable, Iterable, List, Dict, Optional
 
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import Chroma
-from langchain_community.document_loaders import PyMuPDFLoader, UnstructuredPowerPointLoader
-from langchain_community.embeddings import SentenceTransformerEmbeddings
+from langchain_core.embeddings import Embeddings
+
+from embedding_cache import EmbeddingCache, CachedEmbeddings
+from embedding_backends import make_embeddings
+from source_manifest import SourceManifest
+from bm25_index import BM25Index, reciprocal_rank_fusion
+from reranker import CrossEncoderReranker
+from query_batcher import QueryBatcher
+from context_builder import DEFAULT_TOKEN_BUDGET, build_context
+import tracing
+from document_parser import splitter, hash_bytes, hash_text, iter_pages, split_text
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import Chroma
 
 
 BASE_DIR = Path(__file__).parent
-PERSIST_DIR = str(BASE_DIR / "chroma_db")
-PDF_STORE = str(BASE_DIR / "pdf_store")
+# Where the store and its sidecar files live; overridable so benchmarks can use a scratch dir
+DATA_DIR = Path(os.getenv("BRALMA_DATA_DIR", str(BASE_DIR)))
+PERSIST_DIR = str(DATA_DIR / "chroma_db")
+CORPUS_VERSION_PATH = str(DATA_DIR / "chroma_db.version")
+MANIFEST_PATH = str(DATA_DIR / "chroma_db.manifest.sqlite3")
+LEXICAL_INDEX_PATH = str(DATA_DIR / "chroma_db.bm25.sqlite3")
+EMBED_CACHE_PATH = str(DATA_DIR / "embedding_cache.sqlite3")
+EMBED_CACHE_MAX_ENTRIES = 200_000
+EMBED_MODEL = "all-MiniLM-L6-v2"
+# "torch" (fp32 PyTorch) or "onnx-int8" (ONNX Runtime, quantized); falls back to torch
+EMBED_BACKEND = os.getenv("BRALMA_EMBED_BACKEND", "torch")
+EMBED_THREADS = int(os.getenv("BRALMA_EMBED_THREADS", "0")) or None
+EMBED_BATCH_SIZE = int(os.getenv("BRALMA_EMBED_BATCH_SIZE", "32"))
+WRITE_BATCH_SIZE = 256
+PROGRESS_EVERY_PAGES = 10
+
+# "dense" (vector search only) or "hybrid" (vector + BM25, fused with reciprocal rank fusion)
+RETRIEVAL_MODE = os.getenv("BRALMA_RETRIEVAL_MODE", "dense")
+HYBRID_WEIGHTS = (1.0, 1.0)  # (dense, lexical)
+
+# Optional cross-encoder stage: fetch RERANK_POOL_SIZE candidates, keep the best k
+RERANK = os.getenv("BRALMA_RERANK", "0") == "1"
+RERANK_POOL_SIZE = int(os.getenv("BRALMA_RERANK_POOL", "20"))
+
+# Concurrent question embeddings are micro-batched into one forward pass
+QUERY_BATCHING = os.getenv("BRALMA_QUERY_BATCH", "1") == "1"
+QUERY_BATCH_WAIT_MS = float(os.getenv("BRALMA_QUERY_BATCH_WAIT_MS", "2"))
+QUERY_BATCH_SIZE = int(os.getenv("BRALMA_QUERY_BATCH_SIZE", "32"))
+
+# get_context_for_question picks k of CONTEXT_POOL_FACTOR * k candidates (MMR, deduplicated)
+CONTEXT_POOL_FACTOR = 3
+
+os.makedirs(DATA_DIR, exist_ok=True)
+
+embedding_cache: Optional[EmbeddingCache] = None
+# model name as recorded in the cache key and the manifest; includes the backend unless it is torch
+embedding_model_label = EMBED_MODEL
+
+
+class LazyEmbeddings(Embeddings):
+    """Embeddings proxy that loads the model on first use instead of at import time."""
+
+    def __init__(self, factory: Callable[[], Embeddings]):
+        self._factory = factory
+        self._inner: Optional[Embeddings] = None
+        self._lock = threading.Lock()
+        self.query_batcher: Optional[QueryBatcher] = None
+
+    def load(self) -> Embeddings:
+        if self._inner is None:
+            with self._lock:
+                if self._inner is None:
+                    self._inner = self._factory()
+        return self._inner
+
+    def is_loaded(self) -> bool:
+        return self._inner is not None
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.load().embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.query_batcher is not None:
+            return self.query_batcher.embed(text)
+        return self.load().embed_query(text)
+
+    def embed_query_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed several questions in one forward pass, bypassing the chunk embedding cache.
+
+        MiniLM encodes queries and documents the same way, so this equals embed_query per text.
+        """
+        model = self.load()
+        return getattr(model, "inner", model).embed_documents(texts)
+
+
+def _build_embeddings() -> Embeddings:
+    """Load the embedding model for EMBED_BACKEND behind the embedding cache."""
+    global embedding_cache, embedding_model_label
+    model, backend = make_embeddings(EMBED_MODEL, EMBED_BACKEND, threads=EMBED_THREADS, batch_size=EMBED_BATCH_SIZE)
+    # quantized vectors differ slightly, so they get their own cache keys
+    embedding_model_label = EMBED_MODEL if backend == "torch" else f"{EMBED_MODEL}@{backend}"
+
+    # Chunk embeddings are looked up in an on-disk cache before the model is called
+    embedding_cache = EmbeddingCache(EMBED_CACHE_PATH, max_entries=EMBED_CACHE_MAX_ENTRIES)
+    atexit.register(embedding_cache.close)
+    return CachedEmbeddings(model, cache=embedding_cache, model_name=embedding_model_label)
+
+
+embeddings = LazyEmbeddings(_build_embeddings)
+if QUERY_BATCHING:
+    embeddings.query_batcher = QueryBatcher(embeddings.embed_query_batch, max_wait_ms=QUERY_BATCH_WAIT_MS,
+                                            max_batch_size=QUERY_BATCH_SIZE)
+
+
+class VectorStore:
+    """Process-wide handle on the persistent Chroma collection.
+
+    The client is opened lazily on first use and then reused by ingest, query and
+    listing, so a question no longer pays for reopening the store. Streamlit and the
+    CrewAI tools import this module, so they share the same instance.
+    """
+
+    def __init__(self, persist_directory: str, embedding_function):
+        self.persist_directory = persist_directory
+        self.embedding_function = embedding_function
+        self._db: Optional["Chroma"] = None
+        self._lock = threading.RLock()
+
+    def get(self) -> "Chroma":
+        """Return the open Chroma handle, opening it on first call."""
+        db = self._db
+        if db is None:
+            with self._lock:
+                if self._db is None:
+                    from langchain_community.vectorstores import Chroma  # imports chromadb
+
+                    os.makedirs(self.persist_directory, exist_ok=True)
+                    self._db = Chroma(persist_directory=self.persist_directory, embedding_function=self.embedding_function)
+                db = self._db
+        return db
+
+    def is_open(self) -> bool:
+        return self._db is not None
+
+    def write_lock(self) -> threading.RLock:
+        """Lock serializing writes (add/delete/persist) against close and refresh."""
+        return self._lock
+
+    def close(self) -> None:
+        """Drop the handle; the next call to get() reopens the store from disk."""
+        with self._lock:
+            db, self._db = self._db, None
+            if db is None:
+                return
+            client = getattr(db, "_client", None)
+            # chromadb caches one system per path; clear it so a reopen sees fresh state
+            if client is not None and hasattr(client, "clear_system_cache"):
+                try:
+                    client.clear_system_cache()
+                except Exception:
+                    pass
 
-os.makedirs(PDF_STORE, exist_ok=True)
+    def refresh(self) -> "Chroma":
+        """Reopen the store, e.g. after another process ingested documents."""
+        with self._lock:
+            self.close()
+            return self.get()
 
-embeddings = SentenceTransformerEmbeddings(model_name="all-MiniLM-L6-v2")
-splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
 
+store = VectorStore(PERSIST_DIR, embeddings)
+atexit.register(store.close)
 
-def ingest_pdf(file_bytes: bytes, filename: str) -> Dict:
-    """Ingest a document (PDF or PPTX) using LangChain loader and splitter, store chunks in Chroma."""
-    # Detect file type and save with correct extension
-    file_ext = Path(filename).suffix.lower()
-    if file_ext not in ['.pdf', '.pptx']:
-        file_ext = '.pdf'  # default to PDF
-    
-    path = Path(PDF_STORE) / f"{filename}__{int(datetime.utcnow().timestamp())}{file_ext}"
-    path.parent.mkdir(parents=True, exist_ok=True)
+# One row per ingested document, so listing does not scan every chunk
+manifest = SourceManifest(MANIFEST_PATH)
+atexit.register(manifest.close)
 
+# BM25 index over the same chunks, updated together with every Chroma write and delete
+lexical_index = BM25Index(LEXICAL_INDEX_PATH)
+atexit.register(lexical_index.close)
+
+# model is loaded on first rerank
+reranker = CrossEncoderReranker()
+
+
+def get_store() -> "Chroma":
+    """Shared Chroma handle used by ingest, query and listing."""
+    return store.get()
+
+
+def close_store() -> None:
+    store.close()
+
+
+def refresh_store() -> "Chroma":
+    return store.refresh()
+
+
+def _store_has_data() -> bool:
+    return Path(PERSIST_DIR).exists() and any(Path(PERSIST_DIR).iterdir())
+
+
+def corpus_version() -> str:
+    """Opaque token that changes whenever chunks are added to or deleted from the store.
+
+    Kept in a file so ingests from other processes (bulk_ingest) are seen as well.
+    """
     try:
-        with open(path, "wb") as f:
-            f.write(file_bytes)
+        return Path(CORPUS_VERSION_PATH).read_text(encoding="utf-8").strip() or "0"
+    except OSError:
+        return "0"
+
+
+def _bump_corpus_version() -> None:
+    Path(CORPUS_VERSION_PATH).write_text(str(time.time_ns()), encoding="utf-8")
+
+
+_active_ingests = 0
+_active_ingests_lock = threading.Lock()
 
-        # Use appropriate loader based on file type
-        if file_ext == '.pptx':
-            loader = UnstructuredPowerPointLoader(str(path))
+
+def ingest_in_progress() -> bool:
+    """True while ingest_pdf is running in this process (its manifest row is not written yet)."""
+    return _active_ingests > 0
+
+
+def _track_ingest(delta: int) -> None:
+    global _active_ingests
+    with _active_ingests_lock:
+        _active_ingests += delta
+
+
+def _chunk_id(source: str, page_hash: str, index: int) -> str:
+    """Deterministic chunk id, stable across re-uploads of an unchanged page."""
+    return f"{hash_text(source)[:12]}-{page_hash[:16]}-{index}"
+
+
+class ChunkWriter:
+    """Buffers new chunks and writes them to Chroma in large batches.
+
+    Each flush is one add_texts call, so the embedder sees one large batch and Chroma
+    one bulk upsert. Chunks of a page are always flushed together.
+    """
+
+    def __init__(self, batch_size: int = WRITE_BATCH_SIZE, on_flush: Optional[Callable[[int], None]] = None):
+        self.batch_size = batch_size
+        self.on_flush = on_flush
+        self.chunks_written = 0
+        self._texts: List[str] = []
+        self._metadatas: List[Dict] = []
+        self._ids: List[str] = []
+        self._after_flush: List[Callable[[], None]] = []
+
+    def add(self, texts: List[str], metadatas: List[Dict], ids: List[str]) -> None:
+        self._texts.extend(texts)
+        self._metadatas.extend(metadatas)
+        self._ids.extend(ids)
+        if len(self._ids) >= self.batch_size:
+            self.flush()
+
+    def after_flush(self, callback: Callable[[], None]) -> None:
+        """Run callback once everything buffered so far is written (immediately if nothing is)."""
+        if self._ids:
+            self._after_flush.append(callback)
         else:
-            loader = PyMuPDFLoader(str(path))
-        
-        docs = loader.load()
-        docs = splitter.split_documents(docs)
-
-        # attach source metadata (force filename only)
-        for d in docs:
-            if not d.metadata:
-                d.metadata = {}
-            d.metadata["source"] = filename
-
-        os.makedirs(PERSIST_DIR, exist_ok=True)
-        if Path(PERSIST_DIR).exists() and any(Path(PERSIST_DIR).iterdir()):
-            db = Chroma(persist_directory=PERSIST_DIR, embedding_function=embeddings)
-            db.add_documents(docs)
+            callback()
+
+    def flush(self) -> None:
+        if self._ids:
+            with store.write_lock():
+                db = store.get()
+                # same as db.add_texts, split up so embedding and the Chroma write are timed apart
+                with tracing.span("ingest.embed", chunks=len(self._ids)):
+                    vectors = store.embedding_function.embed_documents(self._texts)
+                with tracing.span("chroma.write", chunks=len(self._ids)):
+                    db._collection.upsert(ids=self._ids, embeddings=vectors, metadatas=self._metadatas,
+                                          documents=self._texts)
+                with tracing.span("lexical.write", chunks=len(self._ids)):
+                    lexical_index.add(self._ids, self._texts)
+            written = len(self._ids)
+            self.chunks_written += written
+            _bump_corpus_version()
+            self._texts, self._metadatas, self._ids = [], [], []
+            if self.on_flush:
+                self.on_flush(written)
+        callbacks, self._after_flush = self._after_flush, []
+        for callback in callbacks:
+            callback()
+
+
+def _find_ingested(db: "Chroma", doc_hash: str, filename: str) -> Optional[Dict]:
+    """Return the source and version if a document with this content hash is already stored."""
+    known = manifest.find_by_hash(doc_hash)
+    if known is not None:
+        return {"source": known["source"], "doc_version": known["doc_version"]}
+    # chunks ingested before the manifest existed only carry the hash in their metadata
+    found = db.get(where={"doc_hash": doc_hash}, limit=1, include=["metadatas"])
+    metas = found.get("metadatas") or []
+    if not metas:
+        return None
+    meta = metas[0] or {}
+    return {"source": meta.get("source", filename), "doc_version": meta.get("doc_version", 1)}
+
+
+def _ingest_pages(filename: str, doc_hash: str, pages: Iterable[Dict], writer: ChunkWriter) -> Dict:
+    """Incrementally sync the chunks of one document with its parsed pages.
+
+    Pages whose hash is already stored for this source are kept (and re-tagged with the new
+    version), new pages are split and handed to the writer, and chunks of pages that
+    disappeared are deleted.
+    """
+    # the lock is only held around Chroma reads and writes (ChunkWriter.flush takes it for
+    # its own batches), so deletes and listing stay responsive while a document is parsed
+    with store.write_lock():
+        db = store.get()
+        existing = db.get(where={"source": filename}, include=["metadatas"])
+    existing_ids = existing.get("ids") or []
+    existing_metas = existing.get("metadatas") or []
+    doc_version = max([(m or {}).get("doc_version", 0) for m in existing_metas] or [0]) + 1
+
+    ids_by_page: Dict[str, List[str]] = {}
+    for chunk_id, meta in zip(existing_ids, existing_metas):
+        ids_by_page.setdefault((meta or {}).get("page_hash", ""), []).append(chunk_id)
+
+    page_count = 0
+    chunks_added = 0
+    seen_pages = set()
+    kept_page_meta: Dict[str, Dict] = {}  # page hash -> current metadata of unchanged pages
+    load_seconds = split_seconds = 0.0
+    page_iter = iter(pages)
+    while True:
+        started = time.perf_counter()
+        page = next(page_iter, None)
+        load_seconds += time.perf_counter() - started
+        if page is None:
+            break
+        page_count += 1
+        page_hash = hash_text(page["text"])
+        if page_hash in seen_pages:
+            continue  # identical page repeated inside the document
+        seen_pages.add(page_hash)
+        if page_hash in ids_by_page:
+            # unchanged page, its chunks stay in the store; its position may have moved
+            kept_page_meta[page_hash] = dict(page.get("metadata") or {})
+            continue
+        started = time.perf_counter()
+        chunks = page["chunks"] if page.get("chunks") is not None else split_text(page["text"])
+        split_seconds += time.perf_counter() - started
+        texts, metadatas, ids = [], [], []
+        for i, chunk in enumerate(chunks):
+            chunk_id = _chunk_id(filename, page_hash, i)
+            meta = dict(page.get("metadata") or {})
+            # attach source metadata (force filename only)
+            meta.update(source=filename, doc_hash=doc_hash, page_hash=page_hash,
+                        doc_version=doc_version, chunk_id=chunk_id)
+            texts.append(chunk)
+            metadatas.append(meta)
+            ids.append(chunk_id)
+        writer.add(texts, metadatas, ids)
+        chunks_added += len(ids)
+    tracing.record("ingest.loader", load_seconds, source=filename, pages=page_count)
+    tracing.record("ingest.splitter", split_seconds, source=filename, chunks=chunks_added)
+
+    kept_ids, kept_metas, stale_ids = [], [], []
+    for chunk_id, meta in zip(existing_ids, existing_metas):
+        meta = dict(meta or {})
+        if meta.get("page_hash") in seen_pages:
+            page_hash = meta["page_hash"]
+            # positional metadata (page, total_pages, ...) comes from the new upload, so
+            # inserted, deleted or moved pages do not leave stale page numbers on kept chunks
+            meta = dict(kept_page_meta.get(page_hash, {}), source=filename, doc_hash=doc_hash,
+                        page_hash=page_hash, doc_version=doc_version, chunk_id=meta.get("chunk_id", chunk_id))
+            kept_ids.append(chunk_id)
+            kept_metas.append(meta)
         else:
-            db = Chroma.from_documents(documents=docs, embedding=embeddings, persist_directory=PERSIST_DIR)
-        db.persist()
+            stale_ids.append(chunk_id)
+
+    with store.write_lock():
+        db = store.get()
+        if stale_ids:
+            db.delete(ids=stale_ids)
+            lexical_index.remove(stale_ids)
+            _bump_corpus_version()
+        if kept_ids:
+            db._collection.update(ids=kept_ids, metadatas=kept_metas)
+
+    # record the document only once all of its new chunks are written
+    chunk_count = chunks_added + len(kept_ids)
+    writer.after_flush(lambda: manifest.upsert(filename, doc_hash, doc_version, chunk_count, page_count,
+                                               embedding_model_label))
+
+    return {
+        "filename": filename,
+        "doc_hash": doc_hash,
+        "doc_version": doc_version,
+        "pages": page_count,
+        "chunks_ingested": chunks_added,
+        "chunks_kept": len(kept_ids),
+        "chunks_deleted": len(stale_ids),
+        "chunks_total": chunks_added + len(kept_ids),
+    }
+
+
+def find_ingested(doc_hash: str) -> Optional[Dict]:
+    """Source and version of an already stored document with this content hash, if any."""
+    if not _store_has_data():
+        return None
+    return _find_ingested(store.get(), doc_hash, "")
+
+
+def ingest_parsed(parsed: Dict, writer: ChunkWriter) -> Dict:
+    """Ingest a document already parsed by document_parser.parse_file (used by bulk_ingest)."""
+    return _ingest_pages(parsed["filename"], parsed["doc_hash"], parsed["pages"], writer)
+
+
+def persist_store() -> None:
+    with store.write_lock(), tracing.span("chroma.persist"):
+        store.get().persist()
+
+
+def ingest_pdf(
+    file_bytes: bytes,
+    filename: str,
+    batch_size: int = WRITE_BATCH_SIZE,
+    on_progress: Optional[Callable[[Dict], None]] = None,
+) -> Dict:
+    """Ingest a document (PDF or PPTX) incrementally, keyed by content hash.
 
-        return {"filename": filename, "chunks_ingested": len(docs), "persist_directory": PERSIST_DIR}
+    An unchanged document (under any name) is skipped. Otherwise pages are streamed from
+    the in-memory buffer, and only pages whose hash is new are split, embedded and
+    upserted in batches of batch_size chunks, so memory stays flat and early chunks are
+    searchable before the document is finished. Chunks of pages that disappeared are
+    deleted. Large PDFs are extracted and split by a process pool (see
+    document_parser.iter_pages). on_progress receives pages/chunks counters with a "stage"
+    ("parsing" every PROGRESS_EVERY_PAGES pages, "embedding" after every written batch).
+    """
+    doc_hash = hash_bytes(file_bytes)
+    result = {"filename": filename, "doc_hash": doc_hash, "persist_directory": PERSIST_DIR}
+
+    existing_doc = _find_ingested(store.get(), doc_hash, filename)
+    if existing_doc is not None:
+        result.update(skipped=True, duplicate_of=existing_doc["source"], doc_version=existing_doc["doc_version"],
+                      chunks_ingested=0)
+        return result
+
+    progress = {"filename": filename, "pages_done": 0, "pages_total": None, "chunks_written": 0}
+
+    def counted(pages: Iterable[Dict]) -> Iterable[Dict]:
+        for page in pages:
+            progress["pages_total"] = page["metadata"].get("total_pages", progress["pages_total"])
+            yield page
+            progress["pages_done"] += 1
+            if on_progress and progress["pages_done"] % PROGRESS_EVERY_PAGES == 0:
+                on_progress(dict(progress, stage="parsing"))
+
+    def flushed(written: int) -> None:
+        progress["chunks_written"] += written
+        if on_progress:
+            on_progress(dict(progress, stage="embedding"))
+
+    writer = ChunkWriter(batch_size=batch_size, on_flush=flushed)
+    _track_ingest(1)
+    try:
+        stats = _ingest_pages(filename, doc_hash, counted(iter_pages(file_bytes, filename)), writer)
+        writer.flush()
     finally:
-        # Remove temporary copy to avoid accumulation in pdf_store
-        if path.exists():
-            try:
-                path.unlink()
-            except OSError:
-                pass
-
-def query(question: str, k: int = 4) -> List[Dict]:
+        _track_ingest(-1)
+    persist_store()
+    if on_progress:
+        on_progress(dict(progress, pages_done=stats["pages"], stage="persisted", done=True))
+
+    result.update(stats, skipped=False)
+    return result
+
+
+def _hit(chunk_id: str, content: str, metadata: Optional[Dict], score: float) -> Dict:
+    return {"id": chunk_id, "page_content": content, "metadata": metadata or {}, "score": float(score)}
+
+
+def _hit_key(hit: Dict) -> str:
+    """The Chroma id, which is also the key of the BM25 index (and the chunk_id of newer chunks)."""
+    return hit["id"]
+
+
+def _dense_query(db: "Chroma", embedding: List[float], k: int) -> List[Dict]:
+    # queried on the collection rather than through langchain so the Chroma ids come back too
+    result = db._collection.query(query_embeddings=[embedding], n_results=k,
+                                  include=["documents", "metadatas", "distances"])
+    rows = zip(result["ids"][0], result["documents"][0], result["metadatas"][0], result["distances"][0])
+    return [_hit(chunk_id, content, meta, distance) for chunk_id, content, meta, distance in rows]
+
+
+def _hybrid_query(db: "Chroma", question: str, embedding: List[float], k: int, weights) -> List[Dict]:
+    """Fuse dense and BM25 rankings with reciprocal rank fusion; score is the fused score."""
+    pool = max(k * 4, 20)
+    dense = {_hit_key(h): h for h in _dense_query(db, embedding, pool)}
+    lexical = lexical_index.search(question, k=pool)
+    fused = reciprocal_rank_fusion([list(dense), [cid for cid, _ in lexical]], weights)[:k]
+
+    # lexical-only hits are not in the dense results yet: fetch their text in one call
+    missing = [key for key, _ in fused if key not in dense]
+    fetched = {}
+    if missing:
+        data = db.get(ids=missing, include=["documents", "metadatas"])
+        for chunk_id, content, meta in zip(data.get("ids") or [], data.get("documents") or [], data.get("metadatas") or []):
+            fetched[chunk_id] = _hit(chunk_id, content, meta, 0.0)
+
+    lexical_scores = dict(lexical)
+    out = []
+    for key, fused_score in fused:
+        hit = dense.get(key) or fetched.get(key)
+        if hit is None:
+            continue  # deleted from Chroma but still in the lexical index
+        out.append(dict(hit, score=fused_score, dense_score=hit["score"] if key in dense else None,
+                        lexical_score=lexical_scores.get(key)))
+    return out
+
+
+def query(question: str, k: int = 4, embedding: Optional[List[float]] = None, mode: Optional[str] = None,
+          weights=HYBRID_WEIGHTS, rerank: Optional[bool] = None, pool_size: Optional[int] = None) -> List[Dict]:
+    """Top-k chunks for a question.
+
+    mode is "dense" (distance score, lower is better) or "hybrid" (fused score, higher is
+    better); it defaults to RETRIEVAL_MODE. With rerank (default RERANK) a pool of
+    pool_size candidates is rescored by the cross-encoder and the best k are returned with
+    a "rerank_score". Pass embedding to reuse an already computed question vector.
+    """
     try:
-        db = Chroma(persist_directory=PERSIST_DIR, embedding_function=embeddings)
+        db = store.get()
     except Exception:
         return []
 
-    docs_and_scores = db.similarity_search_with_score(question, k=k)
-    out = []
-    for doc, score in docs_and_scores:
-        out.append({"page_content": doc.page_content, "metadata": getattr(doc, 'metadata', {}), "score": float(score)})
-    return out
+    if embedding is None:
+        with tracing.span("query.embed"):
+            embedding = embeddings.embed_query(question)
+    rerank = RERANK if rerank is None else rerank
+    fetch_k = max(k, pool_size or RERANK_POOL_SIZE) if rerank else k
+    mode = mode or RETRIEVAL_MODE
+    with tracing.span("vector.search", mode=mode, k=fetch_k):
+        if mode == "hybrid":
+            hits = _hybrid_query(db, question, embedding, fetch_k, weights)
+        else:
+            hits = _dense_query(db, embedding, fetch_k)
+    if rerank and hits:
+        with tracing.span("rerank", pool=len(hits), k=k):
+            hits = reranker.rerank(question, hits, top_n=k, key=_hit_key)
+    return hits
+
+
+def rerank_stats() -> Dict:
+    """Added latency and cache statistics of the rerank stage."""
+    return reranker.stats()
+
+
+def query_batch_stats() -> Dict:
+    """Fill rate and added latency of query-embedding micro-batching ({} when disabled)."""
+    batcher = embeddings.query_batcher
+    return batcher.stats() if batcher is not None else {}
+
+
+def repair_lexical_index() -> int:
+    """Index chunks that are in Chroma but missing from the BM25 index (e.g. older stores)."""
+    if not _store_has_data():
+        return 0
+    added = 0
+    with store.write_lock():
+        db = store.get()
+        offset = 0
+        while True:
+            data = db.get(include=["documents"], limit=WRITE_BATCH_SIZE, offset=offset)
+            ids = data.get("ids") or []
+            if not ids:
+                break
+            present = lexical_index.contains(ids)
+            todo = [(cid, doc) for cid, doc in zip(ids, data.get("documents") or []) if cid not in present]
+            if todo:
+                lexical_index.add([cid for cid, _ in todo], [doc for _, doc in todo])
+                added += len(todo)
+            offset += len(ids)
+    return added
+
+
+def _manifest_entry(doc: Dict) -> Dict:
+    return {
+        "name": doc["source"],
+        "chunks": doc["chunk_count"],
+        "pages": doc["page_count"],
+        "doc_hash": doc["content_hash"],
+        "doc_version": doc["doc_version"],
+        "ingested_at": doc["ingested_at"],
+        "embedding_model": doc["embedding_model"],
+    }
 
 
 def list_ingested_sources() -> List[Dict]:
-    """Return distinct sources and chunk counts currently persisted in ChromaDB."""
-    if not Path(PERSIST_DIR).exists() or not any(Path(PERSIST_DIR).iterdir()):
+    """Return the ingested documents (chunk/page counts, content hash, version) from the manifest."""
+    try:
+        if manifest.is_empty():
+            if not _store_has_data() or ingest_in_progress():
+                # a running ingest has chunks in Chroma but no manifest row yet; repairing
+                # now would scan the store and record the document half-written
+                return []
+            # store predates the manifest: build it once from chunk metadata
+            repair_manifest()
+        return [_manifest_entry(doc) for doc in manifest.list()]
+    except Exception:
         return []
 
-    try:
-        db = Chroma(persist_directory=PERSIST_DIR, embedding_function=embeddings)
-        data = db.get(include=["metadatas"])
+
+def repair_manifest() -> List[Dict]:
+    """Rebuild the document manifest by scanning every chunk's metadata in ChromaDB."""
+    if not _store_has_data():
+        manifest.replace_all([])
+        return []
+
+    with store.write_lock():
+        data = store.get().get(include=["metadatas"])
         metadatas = data.get("metadatas", []) or []
-        counts = {}
+        sources = {}
         for meta in metadatas:
-            raw = (meta or {}).get("source", "unknown")
-            src = Path(str(raw)).name  # strip to filename
-            # remove temp suffixes like '__1234567890.ext'
-            if "__" in src:
-                src = src.split("__", 1)[0]
-            counts[src] = counts.get(src, 0) + 1
-        return [{"name": k, "chunks": v} for k, v in counts.items()]
-    except Exception:
-        return []
+            meta = meta or {}
+            src = str(meta.get("source", "unknown"))
+            if Path(src).is_absolute():
+                # old chunks stored the temporary copy's path: strip to the filename and
+                # remove temp suffixes like '__1234567890.ext'
+                src = Path(src).name
+                if "__" in src:
+                    src = src.split("__", 1)[0]
+            entry = sources.setdefault(src, {"source": src, "content_hash": None, "doc_version": 0, "chunk_count": 0,
+                                             "pages": set(), "ingested_at": time.time(), "embedding_model": embedding_model_label})
+            entry["chunk_count"] += 1
+            entry["pages"].add(meta.get("page_hash", meta.get("page")))
+            if meta.get("doc_version", 0) >= entry["doc_version"]:
+                entry["doc_version"] = meta.get("doc_version", 0)
+                entry["content_hash"] = meta.get("doc_hash", entry["content_hash"])
+        docs = []
+        for entry in sources.values():
+            entry["page_count"] = len(entry.pop("pages"))
+            docs.append(entry)
+        manifest.replace_all(docs)
+    return docs
+
+
+def delete_source(name: str) -> int:
+    """Delete all chunks of a document and its manifest row. Returns the number of chunks removed."""
+    if not _store_has_data():
+        manifest.delete(name)
+        return 0
+    with store.write_lock():
+        db = store.get()
+        ids = db.get(where={"source": name}, include=[]).get("ids") or []
+        if ids:
+            db.delete(ids=ids)
+            lexical_index.remove(ids)
+            db.persist()
+            _bump_corpus_version()
+        manifest.delete(name)
+    return len(ids)
+
+
+def _chunk_vectors(hits: List[Dict]) -> List[List[float]]:
+    """Stored Chroma vectors of the hits, fetched by id.
+
+    Only chunks deleted since they were retrieved are embedded again.
+    """
+    vectors: List[Optional[List[float]]] = [None] * len(hits)
+    positions: Dict[str, List[int]] = {}
+    for i, hit in enumerate(hits):
+        positions.setdefault(_hit_key(hit), []).append(i)
+    if positions:
+        data = store.get().get(ids=list(positions), include=["embeddings"])
+        stored = data.get("embeddings")
+        for chunk_id, vector in zip(data.get("ids") or [], stored if stored is not None else []):
+            for i in positions[chunk_id]:
+                vectors[i] = vector
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    if missing:
+        for i, vector in zip(missing, embeddings.embed_documents([hits[i].get("page_content", "") for i in missing])):
+            vectors[i] = vector
+    return vectors
 
 
-def get_context_for_question(question: str, k: int = 4) -> str:
-    hits = query(question, k=k)
-    parts = []
-    for i, h in enumerate(hits, start=1):
-        src = h.get("metadata", {}).get("source", "unknown")
-        parts.append(f"--- Source: {src} | Chunk {i} | Score: {h.get('score'):.4f} ---\n{h.get('page_content')}\n")
-    return "\n".join(parts)
+def get_context_for_question(question: str, k: int = 4, embedding: Optional[List[float]] = None,
+                             mode: Optional[str] = None, rerank: Optional[bool] = None,
+                             token_budget: int = DEFAULT_TOKEN_BUDGET) -> str:
+    """Context for the answer prompt: k diverse chunks, overlaps merged, within token_budget tokens."""
+    hits = query(question, k=k * CONTEXT_POOL_FACTOR, embedding=embedding, mode=mode, rerank=rerank)
+    if not hits:
+        return ""
+    with tracing.span("context.build", pool=len(hits), k=k, budget=token_budget) as span:
+        vectors = _chunk_vectors(hits)
+        built = build_context(hits, vectors, k=k, token_budget=token_budget)
+        span.set(tokens=built["tokens"], chunks_used=built["chunks_used"], parts=built["parts"])
+    return built["context"]
 
 
-__all__ = ["ingest_pdf", "query", "get_context_for_question", "list_ingested_sources"]
\ No newline at end of file
+__all__ = [
+    "ingest_pdf",
+    "query",
+    "get_context_for_question",
+    "list_ingested_sources",
+    "VectorStore",
+    "get_store",
+    "close_store",
+    "refresh_store",
+    "persist_store",
+    "ChunkWriter",
+    "ingest_parsed",
+    "find_ingested",
+    "corpus_version",
+    "LazyEmbeddings",
+    "delete_source",
+    "repair_manifest",
+    "ingest_in_progress",
+    "repair_lexical_index",
+    "rerank_stats",
+    "query_batch_stats",
+]
@@ -0,0 +1,100 @@
+"""
+Native PPTX text extraction with python-pptx.
+
+Replaces UnstructuredPowerPointLoader on the ingest path: no `unstructured` stack, reads
+straight from the uploaded bytes, and emits one page record per slide (title, body text
+in reading order, tables as "cell | cell" rows, speaker notes) with slide-number metadata,
+the same shape document_parser produces for PDF pages. Large decks can be extracted by a
+process pool (the shared spawn pool of worker_pool), each worker handling a contiguous
+range of slides.
+"""
+
+import io
+import os
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Union
+
+from worker_pool import discard_pool, get_pool
+
+# worker processes re-open the deck, which only pays off for big decks
+DEFAULT_WORKERS = int(os.getenv("BRALMA_PPTX_WORKERS", "1"))
+PARALLEL_MIN_SLIDES = 60
+
+
+def _shape_lines(shape) -> List[str]:
+    """Text of one shape; groups are walked recursively and tables become one line per row."""
+    if hasattr(shape, "shapes"):  # group shape
+        lines = []
+        for child in _reading_order(shape.shapes):
+            lines.extend(_shape_lines(child))
+        return lines
+    if getattr(shape, "has_table", False) and shape.has_table:
+        rows = []
+        for row in shape.table.rows:
+            cells = [cell.text.strip() for cell in row.cells]
+            if any(cells):
+                rows.append(" | ".join(cells))
+        return rows
+    if getattr(shape, "has_text_frame", False) and shape.has_text_frame:
+        return [p.text.strip() for p in shape.text_frame.paragraphs if p.text.strip()]
+    return []
+
+
+def _reading_order(shapes) -> list:
+    """Shapes top-to-bottom, then left-to-right (placeholders without a position go first)."""
+    return sorted(shapes, key=lambda s: (s.top if s.top is not None else -1, s.left if s.left is not None else -1))
+
+
+def slide_text(slide) -> Dict:
+    """{"title", "text"} of one slide; text holds the title, body, tables and notes."""
+    title_shape = slide.shapes.title
+    title = title_shape.text_frame.text.strip() if title_shape is not None and title_shape.has_text_frame else ""
+    lines = [title] if title else []
+    for shape in _reading_order(slide.shapes):
+        if title_shape is not None and shape.shape_id == title_shape.shape_id:
+            continue
+        lines.extend(_shape_lines(shape))
+    if slide.has_notes_slide:
+        notes = slide.notes_slide.notes_text_frame.text.strip() if slide.notes_slide.notes_text_frame else ""
+        if notes:
+            lines.append(f"Notes: {notes}")
+    return {"title": title, "text": "\n".join(lines)}
+
+
+def _open(source: Union[bytes, str]):
+    from pptx import Presentation
+
+    return Presentation(io.BytesIO(source) if isinstance(source, bytes) else source)
+
+
+def _page(filename: str, index: int, total: int, extracted: Dict) -> Dict:
+    metadata = {"source": filename, "file_path": filename, "page": index, "slide_number": index + 1,
+                "total_pages": total, "title": extracted["title"]}
+    return {"text": extracted["text"], "metadata": metadata, "chunks": None}
+
+
+def _extract_range(source: Union[bytes, str], filename: str, start: int, stop: Optional[int] = None) -> List[Dict]:
+    slides = list(_open(source).slides)
+    stop = len(slides) if stop is None else min(stop, len(slides))
+    return [_page(filename, i, len(slides), slide_text(slides[i])) for i in range(start, stop)]
+
+
+def extract_slides(source: Union[bytes, str], filename: str, workers: Optional[int] = None) -> List[Dict]:
+    """All slides of a deck; with workers > 1 and a large deck, slide ranges are extracted in parallel."""
+    workers = workers or DEFAULT_WORKERS
+    slides = list(_open(source).slides)
+    total = len(slides)
+    if workers <= 1 or total < PARALLEL_MIN_SLIDES:
+        return [_page(filename, i, total, slide_text(slide)) for i, slide in enumerate(slides)]
+    step = -(-total // workers)
+    pool = get_pool(workers)
+    try:
+        futures = [pool.submit(_extract_range, source, filename, start, start + step) for start in range(0, total, step)]
+        # ranges are submitted in order, so concatenating keeps slide order deterministic
+        return [page for future in futures for page in future.result()]
+    except BrokenProcessPool:
+        discard_pool(pool)
+        raise
+
+
+__all__ = ["extract_slides", "slide_text", "DEFAULT_WORKERS", "PARALLEL_MIN_SLIDES"]
@@ -0,0 +1,100 @@
+"""
+Micro-batching for query embeddings.
+
+Concurrent callers of embed() are collected for up to max_wait_ms (or until max_batch_size
+questions are waiting) and encoded in one batched forward pass on a background thread;
+each caller then gets its own vector back. Identical questions in a batch are encoded once.
+With max_wait_ms=0 nothing is held back: a batch is whatever queued up while the previous
+one was being encoded.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List
+
+DEFAULT_MAX_WAIT_MS = 2.0
+DEFAULT_MAX_BATCH_SIZE = 32
+
+
+class QueryBatcher:
+    def __init__(self, encode_batch: Callable[[List[str]], List[List[float]]],
+                 max_wait_ms: float = DEFAULT_MAX_WAIT_MS, max_batch_size: int = DEFAULT_MAX_BATCH_SIZE):
+        self.encode_batch = encode_batch
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch_size = max_batch_size
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+        self._encoded = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="query-batcher", daemon=True)
+                    self._thread.start()
+
+    def embed(self, text: str) -> List[float]:
+        """Embedding of one question, computed in a batch with concurrent callers."""
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        return future.result()
+
+    def _collect(self) -> List:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            unique = list(dict.fromkeys(text for text, _, _ in batch))
+            try:
+                vectors = dict(zip(unique, self.encode_batch(unique)))
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            for text, future, _ in batch:
+                future.set_result(vectors[text])
+            waits = [started - enqueued for _, _, enqueued in batch]
+            with self._stats_lock:
+                self._batches += 1
+                self._requests += len(batch)
+                self._encoded += len(unique)
+                self._wait_total += sum(waits)
+                self._wait_max = max(self._wait_max, max(waits))
+
+    def stats(self) -> Dict:
+        """Batch fill rate and the queueing latency the batching added."""
+        with self._stats_lock:
+            batches, requests = self._batches, self._requests
+            return {
+                "batches": batches,
+                "requests": requests,
+                "encoded": self._encoded,
+                "avg_batch_size": requests / batches if batches else 0.0,
+                "fill_rate": requests / (batches * self.max_batch_size) if batches else 0.0,
+                "avg_added_ms": self._wait_total / requests * 1000 if requests else 0.0,
+                "max_added_ms": self._wait_max * 1000,
+                "max_wait_ms": self.max_wait * 1000,
+                "max_batch_size": self.max_batch_size,
+            }
+
+
+__all__ = ["QueryBatcher", "DEFAULT_MAX_WAIT_MS", "DEFAULT_MAX_BATCH_SIZE"]
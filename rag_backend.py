@@ -0,0 +1,100 @@
+"""
+The RAG operations the Streamlit frontend needs, behind one interface.
+
+LocalBackend runs them in this process: it owns the embedder, the Chroma store and the
+Groq client. When BRALMA_RAG_SERVICE_URL is set, make_backend() returns a
+rag_client.RagClient with the same methods, so any number of frontends share the models
+and store of a single rag_service process.
+"""
+
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import startup
+import tracing
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+CREW_SRC = PROJECT_ROOT / "bralma_crewai" / "src"
+
+
+class LocalBackend:
+    remote = False
+
+    def __init__(self):
+        # heavy components (embedder, Chroma, CrewAI) still load lazily; these imports are light
+        with startup.timed("import langchain_agent"):
+            import langchain_agent
+        if str(CREW_SRC) not in sys.path:
+            sys.path.insert(0, str(CREW_SRC))
+        with startup.timed("import bralma_crewai.main"):
+            from bralma_crewai import main as crew_main
+        from groq_scheduler import scheduler
+        from ingest_jobs import IngestQueue
+        self._agent = langchain_agent
+        self._crew_main = crew_main
+        self._scheduler = scheduler
+        self._jobs = IngestQueue(str(langchain_agent.DATA_DIR / "ingest_jobs.sqlite3"),
+                                 str(langchain_agent.DATA_DIR / "ingest_uploads"), ingest=langchain_agent.ingest_pdf)
+        # resume jobs left queued or interrupted by an earlier run
+        self._jobs.start()
+
+    def ingest_pdf(self, file_bytes: bytes, filename: str) -> Dict:
+        return self._agent.ingest_pdf(file_bytes, filename)
+
+    def submit_ingest(self, file_bytes: bytes, filename: str) -> Dict:
+        """Queue a document for background ingestion. Returns the job."""
+        return self._jobs.submit(file_bytes, filename)
+
+    def ingest_jobs(self, limit: int = 20) -> List[Dict]:
+        return self._jobs.list(limit)
+
+    def ingest_job(self, job_id: str) -> Optional[Dict]:
+        return self._jobs.get(job_id)
+
+    def list_ingested_sources(self) -> List[Dict]:
+        return self._agent.list_ingested_sources()
+
+    def delete_source(self, name: str) -> int:
+        return self._agent.delete_source(name)
+
+    def refresh_store(self) -> None:
+        self._agent.refresh_store()
+
+    def query(self, question: str, k: int = 4, mode: Optional[str] = None, rerank: Optional[bool] = None) -> List[Dict]:
+        return self._agent.query(question, k=k, mode=mode, rerank=rerank)
+
+    def get_context_for_question(self, question: str, k: int = 4) -> str:
+        return self._agent.get_context_for_question(question, k=k)
+
+    def run_rag(self, question: str, pdf_context: str = "", mode: str = "crew") -> str:
+        return str(self._crew_main.run_rag(question, pdf_context, mode=mode))
+
+    def stream_rag_workflow(self, question: str, pdf_context: str = "", mode: str = "direct",
+                            request_id: Optional[str] = None) -> Iterator[str]:
+        # spans are recorded under the caller's tracing.request(); request_id only matters remotely
+        yield from self._crew_main.stream_rag_workflow(question, pdf_context, mode=mode)
+
+    def stats(self) -> Dict:
+        return {
+            "answer_cache": self._crew_main.answer_cache.stats(),
+            "groq": self._scheduler.stats(),
+            "rerank": self._agent.rerank_stats(),
+            "query_batch": self._agent.query_batch_stats(),
+        }
+
+    def breakdown(self, request_id: str) -> List[Dict]:
+        return tracing.breakdown(request_id)
+
+
+def make_backend():
+    """RagClient for BRALMA_RAG_SERVICE_URL when set, otherwise an in-process LocalBackend."""
+    url = os.getenv("BRALMA_RAG_SERVICE_URL")
+    if url:
+        from rag_client import RagClient
+        return RagClient(url)
+    return LocalBackend()
+
+
+__all__ = ["LocalBackend", "make_backend"]
@@ -0,0 +1,102 @@
+"""
+HTTP client for rag_service, with the same methods as rag_backend.LocalBackend.
+
+    client = RagClient("http://127.0.0.1:8765")
+    for piece in client.stream_rag_workflow("What is entropy?"):
+        print(piece, end="")
+"""
+
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import quote
+
+import requests
+
+CONNECT_TIMEOUT = 5
+# answers through the CrewAI workflow can take minutes under load
+READ_TIMEOUT = 600
+
+
+class RagServiceError(RuntimeError):
+    pass
+
+
+class RagClient:
+    remote = True
+
+    def __init__(self, base_url: str, timeout: float = READ_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (CONNECT_TIMEOUT, timeout)
+        # one pooled keep-alive connection per frontend process
+        self._session = requests.Session()
+
+    def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+        response = self._session.request(method, f"{self.base_url}{path}", timeout=self.timeout, **kwargs)
+        if response.status_code >= 400:
+            try:
+                message = response.json().get("error", response.text)
+            except ValueError:
+                message = response.text
+            raise RagServiceError(f"{method} {path} failed ({response.status_code}): {message}")
+        return response
+
+    def _json(self, method: str, path: str, **kwargs):
+        return self._request(method, path, **kwargs).json()
+
+    def health(self) -> Dict:
+        return self._json("GET", "/health")
+
+    def ingest_pdf(self, file_bytes: bytes, filename: str) -> Dict:
+        return self._json("POST", "/ingest", params={"filename": filename}, data=file_bytes,
+                          headers={"Content-Type": "application/octet-stream"})
+
+    def submit_ingest(self, file_bytes: bytes, filename: str) -> Dict:
+        return self._json("POST", "/jobs", params={"filename": filename}, data=file_bytes,
+                          headers={"Content-Type": "application/octet-stream"})
+
+    def ingest_jobs(self, limit: int = 20) -> List[Dict]:
+        return self._json("GET", "/jobs", params={"limit": limit})
+
+    def ingest_job(self, job_id: str) -> Optional[Dict]:
+        try:
+            return self._json("GET", f"/jobs/{quote(job_id, safe='')}")
+        except RagServiceError:
+            return None
+
+    def list_ingested_sources(self) -> List[Dict]:
+        return self._json("GET", "/sources")
+
+    def delete_source(self, name: str) -> int:
+        return self._json("DELETE", f"/sources/{quote(name, safe='')}")["deleted"]
+
+    def refresh_store(self) -> None:
+        self._request("POST", "/refresh")
+
+    def query(self, question: str, k: int = 4, mode: Optional[str] = None, rerank: Optional[bool] = None) -> List[Dict]:
+        return self._json("POST", "/query", json={"question": question, "k": k, "mode": mode, "rerank": rerank})
+
+    def get_context_for_question(self, question: str, k: int = 4) -> str:
+        return self._json("POST", "/context", json={"question": question, "k": k})["context"]
+
+    def run_rag(self, question: str, pdf_context: str = "", mode: str = "crew") -> str:
+        return self._json("POST", "/answer", json={"question": question, "pdf_context": pdf_context,
+                                                   "mode": mode})["answer"]
+
+    def stream_rag_workflow(self, question: str, pdf_context: str = "", mode: str = "direct",
+                            request_id: Optional[str] = None) -> Iterator[str]:
+        headers = {"X-Request-Id": request_id} if request_id else {}
+        response = self._request("POST", "/answer", stream=True, headers=headers,
+                                 json={"question": question, "pdf_context": pdf_context, "mode": mode, "stream": True})
+        response.encoding = "utf-8"
+        with response:
+            for piece in response.iter_content(chunk_size=None, decode_unicode=True):
+                if piece:
+                    yield piece
+
+    def stats(self) -> Dict:
+        return self._json("GET", "/stats")
+
+    def breakdown(self, request_id: str) -> List[Dict]:
+        return self._json("GET", f"/trace/{quote(request_id, safe='')}")
+
+
+__all__ = ["RagClient", "RagServiceError"]
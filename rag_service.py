@@ -0,0 +1,303 @@
+"""
+Standalone RAG service: one process owns the embedder, the Chroma store and the Groq
+client, and any number of Streamlit frontends talk to it over HTTP (rag_client.RagClient,
+enabled in Frontend.py with BRALMA_RAG_SERVICE_URL).
+
+The server is plain asyncio. Blocking work (embedding, Chroma, LLM calls) runs on a
+bounded thread pool; at most MAX_QUEUE requests may be pending, beyond that new work is
+rejected with 503 and Retry-After so frontends fail fast instead of piling up.
+
+    python rag_service.py --host 127.0.0.1 --port 8765 --workers 4
+
+Endpoints (JSON unless noted):
+    GET    /health                     status, pool size, pending requests
+    GET    /sources                    ingested documents
+    DELETE /sources/<name>             delete a document
+    POST   /ingest?filename=<name>     raw file bytes in the body
+    POST   /jobs?filename=<name>       queue a file (raw bytes) for background ingestion -> job
+    GET    /jobs?limit=<n>             recent ingest jobs with status and progress
+    GET    /jobs/<id>                  one ingest job
+    POST   /refresh                    reopen the Chroma store
+    POST   /query                      {"question", "k", "mode", "rerank"} -> hits
+    POST   /context                    {"question", "k"} -> {"context"}
+    POST   /answer                     {"question", "pdf_context", "mode", "stream"};
+                                       with "stream": true the answer is streamed as chunked text
+    GET    /stats                      answer cache, Groq scheduler and rerank statistics
+    GET    /trace/<request_id>         per-stage latency breakdown of one request
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import tracing
+from rag_backend import LocalBackend
+
+DEFAULT_HOST = os.getenv("BRALMA_RAG_SERVICE_HOST", "127.0.0.1")
+DEFAULT_PORT = int(os.getenv("BRALMA_RAG_SERVICE_PORT", "8765"))
+DEFAULT_WORKERS = int(os.getenv("BRALMA_RAG_SERVICE_WORKERS", "4"))
+MAX_QUEUE = int(os.getenv("BRALMA_RAG_SERVICE_QUEUE", "64"))
+MAX_BODY_BYTES = 200 * 1024 * 1024
+_DONE = object()
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class RagService:
+    def __init__(self, backend=None, workers: int = DEFAULT_WORKERS, max_queue: int = MAX_QUEUE):
+        self.backend = backend or LocalBackend()
+        self.workers = workers
+        self.max_queue = max_queue
+        self.pending = 0
+        self.rejected = 0
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rag-service")
+
+    # -- worker pool --------------------------------------------------------------
+
+    def _reserve(self) -> None:
+        if self.pending >= self.max_queue:
+            self.rejected += 1
+            raise HTTPError(503, "RAG service is busy, retry shortly", {"Retry-After": "1"})
+        self.pending += 1
+
+    async def _run(self, fn, *args, **kwargs):
+        """Run blocking work on the pool; requests beyond max_queue are rejected, not queued."""
+        self._reserve()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, lambda: fn(*args, **kwargs))
+        finally:
+            self.pending -= 1
+
+    # -- HTTP plumbing ------------------------------------------------------------
+
+    @staticmethod
+    async def _read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, _ = line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "malformed request line")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", "0") or 0)
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, "request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target, headers, body
+
+    @staticmethod
+    def _head(status: int, headers: Dict[str, str]) -> bytes:
+        lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"]
+        lines += [f"{k}: {v}" for k, v in headers.items()]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload,
+                         headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        head = {"Content-Type": "application/json", "Content-Length": str(len(body)), **(headers or {})}
+        writer.write(self._head(status, head) + body)
+        await writer.drain()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HTTPError as e:
+                    await self._send_json(writer, e.status, {"error": str(e)}, {"Connection": "close"})
+                    break
+                if request is None:
+                    break
+                method, target, headers, body = request
+                try:
+                    await self._dispatch(writer, method, target, headers, body)
+                except HTTPError as e:
+                    await self._send_json(writer, e.status, {"error": str(e)}, e.headers)
+                except ConnectionError:
+                    raise
+                except Exception as e:
+                    await self._send_json(writer, 500, {"error": f"{type(e).__name__}: {e}"})
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    # -- routes -------------------------------------------------------------------
+
+    async def _dispatch(self, writer, method: str, target: str, headers: Dict[str, str], body: bytes) -> None:
+        url = urlsplit(target)
+        path = url.path.rstrip("/") or "/"
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        payload = json.loads(body) if body and headers.get("content-type", "").startswith("application/json") else {}
+        backend = self.backend
+
+        if method == "GET" and path == "/health":
+            result = {"status": "ok", "workers": self.workers, "pending": self.pending, "rejected": self.rejected}
+        elif method == "GET" and path == "/sources":
+            result = await self._run(backend.list_ingested_sources)
+        elif method == "DELETE" and path.startswith("/sources/"):
+            result = {"deleted": await self._run(backend.delete_source, unquote(path[len("/sources/"):]))}
+        elif method == "POST" and path == "/ingest":
+            filename = params.get("filename")
+            if not filename or not body:
+                raise HTTPError(400, "filename parameter and file body are required")
+            result = await self._run(backend.ingest_pdf, body, filename)
+        elif method == "POST" and path == "/jobs":
+            filename = params.get("filename")
+            if not filename or not body:
+                raise HTTPError(400, "filename parameter and file body are required")
+            result = await self._run(backend.submit_ingest, body, filename)
+        elif method == "GET" and path == "/jobs":
+            result = await self._run(backend.ingest_jobs, int(params.get("limit") or 20))
+        elif method == "GET" and path.startswith("/jobs/"):
+            result = await self._run(backend.ingest_job, unquote(path[len("/jobs/"):]))
+            if result is None:
+                raise HTTPError(404, "no such job")
+        elif method == "POST" and path == "/refresh":
+            await self._run(backend.refresh_store)
+            result = {"status": "ok"}
+        elif method == "POST" and path == "/query":
+            result = await self._run(backend.query, self._question(payload), k=int(payload.get("k") or 4),
+                                     mode=payload.get("mode"), rerank=payload.get("rerank"))
+        elif method == "POST" and path == "/context":
+            result = {"context": await self._run(backend.get_context_for_question, self._question(payload),
+                                                 k=int(payload.get("k") or 4))}
+        elif method == "POST" and path == "/answer":
+            question = self._question(payload)
+            args = (question, payload.get("pdf_context") or "", payload.get("mode") or "direct")
+            if payload.get("stream"):
+                await self._stream_answer(writer, args, headers.get("x-request-id"))
+                return
+            result = {"answer": await self._run(self._traced, headers.get("x-request-id"), backend.run_rag, *args)}
+        elif method == "GET" and path == "/stats":
+            result = {**backend.stats(), "service": {"workers": self.workers, "pending": self.pending,
+                                                     "rejected": self.rejected}}
+        elif method == "GET" and path.startswith("/trace/"):
+            result = backend.breakdown(unquote(path[len("/trace/"):]))
+        else:
+            raise HTTPError(404, f"no route for {method} {path}")
+        await self._send_json(writer, 200, result)
+
+    @staticmethod
+    def _question(payload: Dict) -> str:
+        question = (payload.get("question") or "").strip()
+        if not question:
+            raise HTTPError(400, "question is required")
+        return question
+
+    @staticmethod
+    def _traced(request_id: Optional[str], fn, *args):
+        with tracing.request(request_id):
+            return fn(*args)
+
+    async def _stream_answer(self, writer, args, request_id: Optional[str]) -> None:
+        """Stream answer pieces as chunked text; errors before the first piece become a JSON error response."""
+        self._reserve()
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        cancelled = threading.Event()
+
+        def produce():
+            try:
+                with tracing.request(request_id):
+                    for piece in self.backend.stream_rag_workflow(*args, request_id=request_id):
+                        if cancelled.is_set():
+                            return
+                        loop.call_soon_threadsafe(queue.put_nowait, piece)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, _DONE)
+
+        future = loop.run_in_executor(self._pool, produce)
+        started = False
+        try:
+            while True:
+                item = await queue.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, Exception):
+                    if not started:
+                        raise item
+                    # headers are gone; drop the connection so the client sees an incomplete stream
+                    raise ConnectionError(f"answer stream failed: {item}")
+                if not started:
+                    writer.write(self._head(200, {"Content-Type": "text/plain; charset=utf-8",
+                                                  "Transfer-Encoding": "chunked"}))
+                    started = True
+                data = item.encode("utf-8")
+                writer.write(f"{len(data):X}\r\n".encode("latin-1") + data + b"\r\n")
+                await writer.drain()
+            if not started:
+                writer.write(self._head(200, {"Content-Type": "text/plain; charset=utf-8",
+                                              "Transfer-Encoding": "chunked"}))
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            cancelled.set()
+            # the worker slot stays taken until the producer notices and returns
+            future.add_done_callback(self._release_slot)
+
+    def _release_slot(self, _future) -> None:
+        self.pending -= 1
+
+    # -- lifecycle ----------------------------------------------------------------
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        print(f"RAG service listening on http://{host}:{port} ({self.workers} workers, queue {self.max_queue})")
+        async with server:
+            await server.serve_forever()
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+__all__ = ["RagService", "HTTPError"]
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Serve ingest, retrieval and answers to Streamlit frontends.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="threads running blocking RAG work")
+    parser.add_argument("--max-queue", type=int, default=MAX_QUEUE, help="pending requests before answering 503")
+    parser.add_argument("--no-warm-up", action="store_true", help="load the embedder and store on first request")
+    args = parser.parse_args(argv)
+
+    service = RagService(workers=args.workers, max_queue=args.max_queue)
+    if not args.no_warm_up:
+        import startup
+        startup.warm_up()
+        for item in startup.startup_report():
+            print(f"  {item['component']}: {item['seconds'] * 1000:.0f} ms")
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Optional cross-encoder rerank stage for retrieval.
+
+A larger candidate pool from the vector (or hybrid) search is rescored with a small local
+cross-encoder in CPU batches and only the best N go into the prompt. Pair scores are
+cached by (question hash, chunk id), and every call records its added latency so the
+pool size can be tuned against prompt size.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from embedding_cache import normalize_text
+
+RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+class CrossEncoderReranker:
+    def __init__(self, model_name: str = RERANK_MODEL, batch_size: int = 32, cache_size: int = 20_000):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._model = None
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[tuple, float]" = OrderedDict()
+        self.calls = 0
+        self.pairs_scored = 0
+        self.cache_hits = 0
+        self.total_ms = 0.0
+        self.last: Dict = {}
+
+    def _load(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.model_name, device="cpu")
+        return self._model
+
+    @staticmethod
+    def _question_hash(question: str) -> str:
+        return hashlib.sha256(normalize_text(question).lower().encode("utf-8")).hexdigest()
+
+    def rerank(self, question: str, hits: List[Dict], top_n: int, key=None) -> List[Dict]:
+        """Return the top_n hits by cross-encoder score (stored as "rerank_score")."""
+        start = time.perf_counter()
+        key = key or (lambda h: h["metadata"].get("chunk_id") or hashlib.sha256(h["page_content"].encode("utf-8")).hexdigest())
+        qhash = self._question_hash(question)
+        cache_keys = [(qhash, key(h)) for h in hits]
+
+        scores: List[Optional[float]] = []
+        with self._lock:
+            for ck in cache_keys:
+                score = self._cache.get(ck)
+                if score is not None:
+                    self._cache.move_to_end(ck)
+                scores.append(score)
+        todo = [i for i, score in enumerate(scores) if score is None]
+        if todo:
+            pairs = [(question, hits[i]["page_content"]) for i in todo]
+            predicted = self._load().predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+            with self._lock:
+                for i, score in zip(todo, predicted):
+                    scores[i] = float(score)
+                    self._cache[cache_keys[i]] = float(score)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        ranked = sorted((dict(h, rerank_score=s) for h, s in zip(hits, scores)),
+                        key=lambda h: h["rerank_score"], reverse=True)[:top_n]
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.calls += 1
+        self.pairs_scored += len(todo)
+        self.cache_hits += len(hits) - len(todo)
+        self.total_ms += elapsed_ms
+        self.last = {"pool_size": len(hits), "top_n": top_n, "scored": len(todo),
+                     "cache_hits": len(hits) - len(todo), "latency_ms": elapsed_ms}
+        return ranked
+
+    def stats(self) -> Dict:
+        return {
+            "calls": self.calls,
+            "pairs_scored": self.pairs_scored,
+            "cache_hits": self.cache_hits,
+            "mean_latency_ms": (self.total_ms / self.calls) if self.calls else 0.0,
+            "last": dict(self.last),
+        }
+
+
+__all__ = ["CrossEncoderReranker", "RERANK_MODEL"]
@@ -0,0 +1,115 @@
+"""
+Persisted manifest of ingested documents, kept next to chroma_db.
+
+One row per source (name, content hash, version, chunk and page counts, ingest time and
+embedding model), so listing documents is O(documents) instead of a scan over every
+chunk's metadata. Ingest and delete update it in a single SQLite transaction once their
+Chroma writes are done; `python source_manifest.py --repair` rebuilds it from Chroma.
+"""
+
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+COLUMNS = ("source", "content_hash", "doc_version", "chunk_count", "page_count", "ingested_at", "embedding_model")
+
+
+class SourceManifest:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                " source TEXT PRIMARY KEY,"
+                " content_hash TEXT,"
+                " doc_version INTEGER NOT NULL DEFAULT 1,"
+                " chunk_count INTEGER NOT NULL DEFAULT 0,"
+                " page_count INTEGER NOT NULL DEFAULT 0,"
+                " ingested_at REAL NOT NULL,"
+                " embedding_model TEXT)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_hash ON documents(content_hash)")
+
+    @staticmethod
+    def _row(row) -> Dict:
+        return dict(zip(COLUMNS, row))
+
+    def upsert(self, source: str, content_hash: str, doc_version: int, chunk_count: int, page_count: int,
+               embedding_model: str, ingested_at: Optional[float] = None) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (source, content_hash, doc_version, chunk_count, page_count,"
+                " ingested_at, embedding_model) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (source, content_hash, doc_version, chunk_count, page_count,
+                 ingested_at if ingested_at is not None else time.time(), embedding_model),
+            )
+
+    def delete(self, source: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM documents WHERE source = ?", (source,))
+
+    def get(self, source: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM documents WHERE source = ?", (source,)
+            ).fetchone()
+        return self._row(row) if row else None
+
+    def find_by_hash(self, content_hash: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM documents WHERE content_hash = ? LIMIT 1", (content_hash,)
+            ).fetchone()
+        return self._row(row) if row else None
+
+    def list(self) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {', '.join(COLUMNS)} FROM documents ORDER BY ingested_at").fetchall()
+        return [self._row(r) for r in rows]
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM documents LIMIT 1").fetchone() is None
+
+    def replace_all(self, documents: Iterable[Dict]) -> None:
+        """Swap the whole manifest in one transaction (used by repair)."""
+        rows = [tuple(doc.get(c) for c in COLUMNS) for doc in documents]
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM documents")
+            self._conn.executemany(
+                f"INSERT INTO documents ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", rows
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+__all__ = ["SourceManifest"]
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect or repair the ingested-documents manifest.")
+    parser.add_argument("--repair", action="store_true",
+                        help="rebuild the manifest from ChromaDB and index chunks missing from the BM25 index")
+    args = parser.parse_args()
+
+    import langchain_agent
+
+    if args.repair:
+        docs = langchain_agent.repair_manifest()
+        print(f"Manifest rebuilt from ChromaDB: {len(docs)} document(s)")
+        print(f"Lexical index: {langchain_agent.repair_lexical_index()} missing chunk(s) indexed")
+    for doc in langchain_agent.list_ingested_sources():
+        print(f"{doc['name']}: {doc['chunks']} chunks, {doc.get('pages', 0)} pages, version {doc.get('doc_version')}")
+
+
+if __name__ == "__main__":
+    main()
+
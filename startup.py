@@ -0,0 +1,137 @@
+"""
+Startup timing and background warm-up for the Streamlit app.
+
+Heavy components (embedding model, Chroma client, CrewAI, Groq client) are initialized
+lazily. warm_up() loads them ahead of the first question, optionally on a background
+thread, and every import/initialization step is recorded for startup_report().
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+_timings: Dict[str, float] = {}
+_timings_lock = threading.Lock()
+_warm_up_thread: Optional[threading.Thread] = None
+FIRST_PAINT = "first script run to first paint"
+FIRST_PAINT_TARGET_SECONDS = float(os.getenv("BRALMA_FIRST_PAINT_TARGET", "1.0"))
+
+
+def _process_start_time() -> Optional[float]:
+    """Wall-clock start of this process (not of this module's import), if the OS tells us."""
+    try:
+        with open("/proc/self/stat") as f:
+            # the command name may contain spaces, so count fields after its closing ')'
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/stat") as f:
+            boot_time = next(int(line.split()[1]) for line in f if line.startswith("btime "))
+        return boot_time + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, StopIteration):
+        pass
+    try:
+        import psutil
+        return psutil.Process().create_time()
+    except Exception:
+        return None
+
+
+_process_start = _process_start_time()
+
+
+def record(component: str, seconds: float) -> None:
+    """Record the cost of a component; only the first (cold) measurement is kept."""
+    with _timings_lock:
+        _timings.setdefault(component, seconds)
+
+
+@contextmanager
+def timed(component: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(component, time.perf_counter() - start)
+
+
+def _init_embedder():
+    import langchain_agent
+    langchain_agent.embeddings.load()
+
+
+def _init_store():
+    import langchain_agent
+    langchain_agent.get_store()
+
+
+def _init_crewai():
+    import bralma_crewai.crew  # noqa: F401
+
+
+def _init_groq():
+    import groq_client
+    groq_client.get_client()
+
+
+WARM_UP_STEPS: Dict[str, Callable[[], None]] = {
+    "init embedder": _init_embedder,
+    "init vector store": _init_store,
+    "import crewai": _init_crewai,
+    "init groq client": _init_groq,
+}
+
+
+def warm_up() -> None:
+    """Initialize every heavy component in the current thread; failures are recorded, not raised."""
+    for name, step in WARM_UP_STEPS.items():
+        try:
+            with timed(name):
+                step()
+        except Exception as e:
+            print(f"Warm-up step '{name}' failed: {e}")
+
+
+def start_warm_up() -> threading.Thread:
+    """Run warm_up() once per process on a daemon thread."""
+    global _warm_up_thread
+    with _timings_lock:
+        if _warm_up_thread is None:
+            _warm_up_thread = threading.Thread(target=warm_up, name="bralma-warm-up", daemon=True)
+            _warm_up_thread.start()
+    return _warm_up_thread
+
+
+def warm_up_done() -> bool:
+    return _warm_up_thread is not None and not _warm_up_thread.is_alive()
+
+
+def startup_report() -> List[Dict]:
+    """Recorded import/initialization costs, most expensive first."""
+    with _timings_lock:
+        items = list(_timings.items())
+    return [{"component": name, "seconds": secs} for name, secs in sorted(items, key=lambda kv: kv[1], reverse=True)]
+
+
+def since_process_start() -> Optional[float]:
+    """Seconds since the process started, or None where the start time is unknown."""
+    return None if _process_start is None else time.time() - _process_start
+
+
+def record_first_paint(script_start: float) -> None:
+    """Record first paint, from the perf_counter() taken at the top of the first script run
+    and, where known, from process start (which includes server startup and the wait for
+    the first browser session)."""
+    record(FIRST_PAINT, time.perf_counter() - script_start)
+    since_start = since_process_start()
+    if since_start is not None:
+        record("process start to first paint", since_start)
+
+
+def first_paint() -> Optional[float]:
+    with _timings_lock:
+        return _timings.get(FIRST_PAINT)
+
+
+__all__ = ["record", "timed", "warm_up", "start_warm_up", "warm_up_done", "startup_report", "since_process_start",
+           "record_first_paint", "first_paint", "FIRST_PAINT_TARGET_SECONDS"]
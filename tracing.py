@@ -0,0 +1,142 @@
+"""
+Lightweight per-stage tracing for ingest, retrieval and LLM calls.
+
+Every stage records a timed span tagged with the current request id. Spans go to an
+in-memory ring of recent requests (shown in the Streamlit sidebar) and, when
+BRALMA_TRACE_LOG is set, to a JSON-lines log. Tracing is off unless BRALMA_TRACE=1 (or
+enable() is called); when off, span() returns a shared no-op object, so instrumented code
+pays about one attribute lookup per stage.
+
+    with tracing.request() as request_id:
+        with tracing.span("vector.search", k=4):
+            ...
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+MAX_REQUESTS = 200
+
+_enabled = os.getenv("BRALMA_TRACE", "0") == "1"
+_log_path: Optional[str] = os.getenv("BRALMA_TRACE_LOG") or None
+_request_id: contextvars.ContextVar = contextvars.ContextVar("bralma_request_id", default=None)
+_requests: "OrderedDict[str, List[Dict]]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def enable(flag: bool = True, log_path: Optional[str] = None) -> None:
+    global _enabled, _log_path
+    _enabled = flag
+    if log_path is not None:
+        _log_path = log_path
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+@contextmanager
+def request(request_id: Optional[str] = None):
+    """Scope a request id over everything traced inside the block (and copied contexts)."""
+    request_id = request_id or uuid.uuid4().hex[:12]
+    token = _request_id.set(request_id)
+    try:
+        yield request_id
+    finally:
+        _request_id.reset(token)
+
+
+def record(name: str, seconds: float, **attrs) -> None:
+    """Record a finished span with an explicit duration (for time accumulated across a loop)."""
+    if not _enabled:
+        return
+    entry = {"request_id": _request_id.get(), "name": name, "ms": seconds * 1000, "ts": time.time(), **attrs}
+    with _lock:
+        key = entry["request_id"] or "-"
+        spans = _requests.get(key)
+        if spans is None:
+            spans = _requests[key] = []
+            while len(_requests) > MAX_REQUESTS:
+                _requests.popitem(last=False)
+        spans.append(entry)
+        if _log_path:
+            with open(_log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+
+
+class _Span:
+    __slots__ = ("name", "attrs", "start")
+
+    def __init__(self, name: str, attrs: Dict):
+        self.name = name
+        self.attrs = attrs
+        self.start = 0.0
+
+    def set(self, **attrs) -> None:
+        """Attach attributes known only after the work, e.g. token counts."""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        record(self.name, time.perf_counter() - self.start, **self.attrs)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attrs) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name: str, **attrs):
+    """Context manager timing one stage; a shared no-op when tracing is disabled."""
+    if not _enabled:
+        return _NOOP
+    return _Span(name, attrs)
+
+
+def spans_for(request_id: str) -> List[Dict]:
+    with _lock:
+        return list(_requests.get(request_id, []))
+
+
+def breakdown(request_id: str) -> List[Dict]:
+    """Total time and call count per stage for one request, slowest first."""
+    totals: Dict[str, Dict] = {}
+    for entry in spans_for(request_id):
+        stage = totals.setdefault(entry["name"], {"name": entry["name"], "ms": 0.0, "calls": 0})
+        stage["ms"] += entry["ms"]
+        stage["calls"] += 1
+        for key in ("prompt_tokens", "completion_tokens"):
+            if entry.get(key) is not None:
+                stage[key] = stage.get(key, 0) + entry[key]
+    return sorted(totals.values(), key=lambda s: s["ms"], reverse=True)
+
+
+__all__ = ["enable", "is_enabled", "request", "span", "record", "current_request_id", "spans_for", "breakdown"]
@@ -0,0 +1,35 @@
+"""
+Shared process pools for CPU-bound parsing inside the app (large PDFs and decks).
+
+Pools are spawned rather than forked: ingest runs in a thread of a process that already
+holds the embedding model and other threads' locks, which a forked child would inherit.
+One pool per worker count is started on first use and kept, so the spawn cost is paid
+once; a pool whose worker died (OOM, segfault) is dropped and started again next time.
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict
+
+_pools: Dict[int, ProcessPoolExecutor] = {}
+_lock = threading.Lock()
+
+
+def get_pool(workers: int) -> ProcessPoolExecutor:
+    with _lock:
+        if workers not in _pools:
+            _pools[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pools[workers]
+
+
+def discard_pool(pool: ProcessPoolExecutor) -> None:
+    """Forget a broken pool so the next get_pool starts a new one."""
+    with _lock:
+        for workers, known in list(_pools.items()):
+            if known is pool:
+                del _pools[workers]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+__all__ = ["get_pool", "discard_pool"]